@@ -1,9 +1,15 @@
 # app.py  ― fully updated Flask backend for the movie‑recommender stack
 # ---------------------------------------------------------------
 import os
+import json
+import time
+import hashlib
 import logging
+import functools
 from flask import (
     Flask,
+    Response,
+    g,
     request,
     jsonify,
     render_template,
@@ -11,8 +17,13 @@ from flask import (
 )
 from flask_cors import CORS
 from werkzeug.utils import safe_join         # Flask 3.x no longer re‑exports this
-from model import MovieRecommender
+from model import MovieRecommender, RECOMMENDATION_MODES
+from ratings_tail import RatingsTail
+from profiler import SamplingProfiler
+from singleflight import SingleFlight
+from llm_cache import MemoryBackend, ResponseCache
 import emotion_flix
+import metrics
 
 # ────────────────────────────────────────────────────────────────
 # basic logging config
@@ -23,6 +34,12 @@ app = Flask(__name__)  # Use default static folder
 CORS(app)             # enable cross‑origin requests
 app.secret_key = os.getenv("SESSION_SECRET", "dev_secret_key")
 
+# upper bound on seeds accepted by /api/recommend/batch
+MAX_BATCH_SEEDS = int(os.getenv("MAX_BATCH_SEEDS", "500"))
+
+# upper bound on the page size of /api/users/<userId>/recommendations
+MAX_USER_PAGE = int(os.getenv("MAX_USER_PAGE", "100"))
+
 # instantiate the recommender once at startup
 try:
     recommender = MovieRecommender()
@@ -31,8 +48,158 @@ except Exception as exc:
     app.logger.error(f"Failed to init recommender: {exc}")
     recommender = None
 
+# optionally follow a ratings CSV for new rows (RATINGS_TAIL=path); the tail
+# and its offset are set up here, with the model, so every gunicorn worker
+# forked from the preloading master (including restarted ones) resumes from
+# the same position; each worker then starts its own polling thread (see
+# start_worker_threads)
+ratings_tail = None
+if os.getenv("RATINGS_TAIL") and recommender is not None:
+    try:
+        ratings_tail = RatingsTail(os.getenv("RATINGS_TAIL"), recommender,
+                                   interval=float(os.getenv("RATINGS_TAIL_INTERVAL", "5")))
+    except OSError as exc:
+        app.logger.error(f"Cannot tail ratings: {exc}")
+
+
+# request latency by route, plus an opt-in sampling profiler of request
+# threads (PROFILE_INTERVAL_MS=<ms>, read back from /debug/profile)
+REQUEST_SECONDS = metrics.Histogram("movierec_http_request_seconds",
+                                    "Time to produce a response (headers only for streams).",
+                                    metrics.LATENCY_BUCKETS, ("route", "method", "status"))
+profiler = None
+if os.getenv("PROFILE_INTERVAL_MS"):
+    profiler = SamplingProfiler(interval=float(os.getenv("PROFILE_INTERVAL_MS")) / 1000)
+
+
+def start_worker_threads():
+    """Start this process's background threads: metrics flusher, profiler sampler and ratings tail.
+
+    Threads do not survive fork(), so they are not started at import (in a
+    preloading gunicorn master) but once in each process that serves
+    requests: by the post_worker_init hook in gunicorn.conf.py, or by
+    main.py before the development server starts.
+    """
+    metrics.start_flusher()
+    if profiler is not None:
+        profiler.start()
+    if ratings_tail is not None:
+        ratings_tail.start()
+
+
+@app.before_request
+def start_request_metrics():
+    """Time the request and mark its thread for the profiler."""
+    g.request_start = time.perf_counter()
+    if profiler is not None:
+        profiler.enter()
+
+
+@app.after_request
+def record_request_metrics(response):
+    if profiler is not None:
+        profiler.exit()
+    start = g.get("request_start")
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        REQUEST_SECONDS.observe(time.perf_counter() - start, route, request.method, str(response.status_code))
+    return response
+
+
+def json_fragments(**fragments):
+    """JSON response for an object whose values are already-encoded JSON bytes.
+
+    Produces exactly what jsonify would for the decoded values (sorted keys,
+    compact separators, ASCII-only, trailing newline) without building the
+    Python objects. If the app's JSON settings ask for any other formatting,
+    falls back to decoding the fragments and calling jsonify.
+    """
+    provider = app.json
+    compact = provider.compact if provider.compact is not None else not app.debug
+    if not (compact and getattr(provider, "sort_keys", False) and getattr(provider, "ensure_ascii", False)):
+        return jsonify({key: json.loads(value) for key, value in fragments.items()})
+    body = b",".join(b'"%s":%s' % (key.encode(), value) for key, value in sorted(fragments.items()))
+    return app.response_class(b"{" + body + b"}\n", mimetype=provider.mimetype)
+
+
+# read-only GET responses are cached per dataset version (RESPONSE_CACHE_SIZE
+# entries per process, 0 to disable), identical requests in flight share one
+# computation, and clients may reuse a response for RESPONSE_MAX_AGE seconds,
+# then revalidate it by ETag
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "4096"))
+RESPONSE_MAX_AGE = int(os.getenv("RESPONSE_MAX_AGE", "60"))
+response_cache = ResponseCache(MemoryBackend(RESPONSE_CACHE_SIZE), ttl=float("inf")) if RESPONSE_CACHE_SIZE else None
+single_flight = SingleFlight()
+RESPONSES = metrics.Counter("movierec_responses_total",
+                            "Cacheable API responses by how the body was produced (computed, shared, cached); "
+                            "not_modified counts those then answered with a 304.", ("outcome",))
+
+
+def _response_cache_metrics():
+    if response_cache is None:
+        return {}
+    stats = response_cache.stats()
+    return {f"movierec_response_cache_{name}_total": ("counter", f"Response cache {name}.", (), [[[], stats[name]]])
+            for name in ("hits", "misses", "evictions")}
+
+
+metrics.register_collector(_response_cache_metrics)
+
+
+def cacheable(view):
+    """Serve a read-only GET route from the response cache, coalescing identical requests in flight.
+
+    Responses are looked up by path, query string and the recommender's
+    dataset version; on a miss the view runs once for all identical
+    concurrent requests, and a 200 is cached. A 200 carries an ETag of the
+    dataset version plus a digest of its body, and a request whose
+    If-None-Match matches it (by weak comparison, so W/"..." counts) gets a
+    304 instead; other statuses carry none, so invalid input is always
+    answered by the view. Entries of older versions are never served and
+    age out of the LRU.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if recommender is None:
+            return view(*args, **kwargs)
+        version = recommender.dataset_version()
+        key = (request.path, tuple(sorted(request.args.items(multi=True))), version)
+        cached = response_cache.get(key) if response_cache is not None else None
+        if cached is not None:
+            RESPONSES.inc(1, "cached")
+            status, body, content_type, etag = cached
+        else:
+            def compute():
+                response = app.make_response(view(*args, **kwargs))
+                body = response.get_data()
+                etag = None
+                if response.status_code == 200:
+                    etag = f"{version}-{hashlib.sha256(body).hexdigest()[:16]}"
+                result = (response.status_code, body, response.content_type, etag)
+                if response_cache is not None and etag is not None:
+                    response_cache.set(key, result)
+                return result
+
+            (status, body, content_type, etag), shared = single_flight.do(key, compute)
+            RESPONSES.inc(1, "shared" if shared else "computed")
+
+        if etag is None:
+            return app.response_class(body, status=status, content_type=content_type)
+        if request.if_none_match.contains_weak(etag):
+            RESPONSES.inc(1, "not_modified")
+            response = app.response_class(status=304)
+        else:
+            response = app.response_class(body, status=status, content_type=content_type)
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = f"public, max-age={RESPONSE_MAX_AGE}"
+        return response
+
+    return wrapper
+
+
 # ───────────────────────────── API ROUTES ───────────────────────
 @app.route("/api/search")
+@cacheable
 def search_movies():
     """Search movies by title substring (min 3 chars)."""
     query = request.args.get("query", "").strip()
@@ -40,24 +207,38 @@ def search_movies():
         # return 200 with empty list so the front‑end doesn’t treat it as an error
         return jsonify({"results": []})
     try:
-        results = recommender.search_movies(query)
-        return jsonify({"results": results.to_dict(orient="records")})
+        results = recommender.search_movies_json(query)
+        with metrics.stage("serialize"):
+            return json_fragments(results=results)
     except Exception as exc:
         app.logger.error(f"Search error: {exc}")
         return jsonify({"error": str(exc), "results": []}), 500
 
 
 @app.route("/api/recommend")
+@cacheable
 def recommend_movies():
     """Get recommendations based on a seed movie."""
     movie_id = request.args.get('movieId')
     if not movie_id:
         return jsonify({"error": "No movie ID provided", "recommendations": []}), 400
     
+    # engine: "cooccurrence" (default), "als" (needs train_factors.py output)
+    # or "hybrid" (needs build_content.py output)
+    mode = request.args.get("mode", "cooccurrence")
+    if mode not in RECOMMENDATION_MODES:
+        return jsonify({"error": f"mode must be one of {', '.join(RECOMMENDATION_MODES)}",
+                        "recommendations": []}), 400
+    if mode == "als" and recommender.factors is None:
+        return jsonify({"error": "Matrix-factorization model not available", "recommendations": []}), 503
+    if mode == "hybrid" and recommender.content is None:
+        return jsonify({"error": "Content-similarity table not available", "recommendations": []}), 503
+    
     try:
         movie_id = int(movie_id)
-        recs = recommender.get_recommendations(movie_id)
-        return jsonify({"recommendations": recs.to_dict(orient="records")})
+        recs = recommender.get_recommendations_json(movie_id, mode=mode)
+        with metrics.stage("serialize"):
+            return json_fragments(recommendations=recs)
     except ValueError:
         return jsonify({"error": "Invalid movie ID", "recommendations": []}), 400
     except Exception as exc:
@@ -65,7 +246,69 @@ def recommend_movies():
         return jsonify({"error": str(exc), "recommendations": []}), 500
 
 
+@app.route("/api/recommend/batch", methods=["POST"])
+def recommend_batch():
+    """Get recommendations for many seed movies in one call.
+    Body: {"movieIds": [...], "aggregate": false}. With aggregate the seeds are
+    merged into a single ranked list that excludes the seeds themselves; it is
+    always scored live (see MovieRecommender.get_recommendations_batch)."""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Body must be a JSON object", "recommendations": []}), 400
+    movie_ids = data.get("movieIds")
+    aggregate = data.get("aggregate", False)
+    if not isinstance(aggregate, bool):
+        return jsonify({"error": "aggregate must be true or false", "recommendations": []}), 400
+    if not isinstance(movie_ids, list) or not movie_ids:
+        return jsonify({"error": "movieIds must be a non-empty list", "recommendations": []}), 400
+    if len(movie_ids) > MAX_BATCH_SEEDS:
+        return jsonify({"error": f"At most {MAX_BATCH_SEEDS} movieIds per request", "recommendations": []}), 400
+
+    # only JSON integers: int() would also take 1.7, true and "12"
+    if not all(isinstance(movie_id, int) and not isinstance(movie_id, bool) for movie_id in movie_ids):
+        return jsonify({"error": "Invalid movie ID", "recommendations": []}), 400
+
+    try:
+        recs = recommender.get_recommendations_batch_json(movie_ids, aggregate=aggregate)
+        with metrics.stage("serialize"):
+            if aggregate:
+                return json_fragments(recommendations=recs)
+            return json_fragments(results=recs)
+    except Exception as exc:
+        app.logger.error(f"Batch recommendation error: {exc}")
+        return jsonify({"error": str(exc), "recommendations": []}), 500
+
+
+@app.route("/api/users/<int:user_id>/recommendations")
+@cacheable
+def user_recommendations(user_id: int):
+    """Recommendations for an existing user from their whole rating history.
+    Paged with ?offset=0&limit=10 (limit at most MAX_USER_PAGE); `total` is the
+    number of recommendations available across pages."""
+    try:
+        offset = int(request.args.get("offset", 0))
+        limit = int(request.args.get("limit", 10))
+    except ValueError:
+        return jsonify({"error": "offset and limit must be integers", "recommendations": []}), 400
+    if offset < 0 or not 0 < limit <= MAX_USER_PAGE:
+        return jsonify({"error": f"offset must be >= 0 and limit between 1 and {MAX_USER_PAGE}",
+                        "recommendations": []}), 400
+
+    try:
+        result = recommender.get_user_recommendations_json(user_id, offset=offset, limit=limit)
+        if result is None:
+            return jsonify({"error": "User not found", "recommendations": []}), 404
+        recs, total = result
+        with metrics.stage("serialize"):
+            return json_fragments(userId=b"%d" % user_id, offset=b"%d" % offset, limit=b"%d" % limit,
+                                  total=b"%d" % total, recommendations=recs)
+    except Exception as exc:
+        app.logger.error(f"User recommendation error: {exc}")
+        return jsonify({"error": str(exc), "recommendations": []}), 500
+
+
 @app.route("/api/direct-recommend")
+@cacheable
 def direct_recommend():
     """Search for a movie by title and get recommendations in one call.
     This mimics the behavior of the Jupyter notebook."""
@@ -75,35 +318,36 @@ def direct_recommend():
     
     try:
         # First search for the movie
-        search_results = recommender.search_movies(query, max_results=1)
+        search_results = recommender.search_movie_ids(query, max_results=1)
         if len(search_results) == 0:
             return jsonify({"error": "No movies found", "current_movie": None, "recommendations": []}), 404
         
         # Get the top movie from search results
-        movie = search_results.iloc[0]
-        movie_id = movie["movieId"]
+        movie_id = int(search_results[0])
         
         # Get recommendations based on that movie
-        recommendations = recommender.get_recommendations(movie_id)
+        recommendations = recommender.get_recommendations_json(movie_id)
         
         # Return both the current movie and recommendations
-        return jsonify({
-            "current_movie": movie.to_dict(),
-            "recommendations": recommendations.to_dict(orient="records")
-        })
+        with metrics.stage("serialize"):
+            return json_fragments(
+                current_movie=recommender.get_movie_json(movie_id, clean_title=False),
+                recommendations=recommendations,
+            )
     except Exception as exc:
         app.logger.error(f"Direct recommendation error: {exc}")
         return jsonify({"error": str(exc), "current_movie": None, "recommendations": []}), 500
 
 
 @app.route("/api/movies/<int:movie_id>")
+@cacheable
 def get_movie(movie_id: int):
     """Return metadata for a single movie."""
     try:
-        movie = recommender.get_movie(movie_id)
+        movie = recommender.get_movie_json(movie_id)
         if movie is None:
             return jsonify({"error": "Movie not found"}), 404
-        return jsonify({"movie": movie.to_dict()})
+        return json_fragments(movie=movie)
     except Exception as exc:
         app.logger.error(f"Get‑movie error: {exc}")
         return jsonify({"error": str(exc)}), 500
@@ -188,6 +432,67 @@ def emotion_chat():
         return jsonify({"error": str(exc)}), 500
 
 
+@app.route("/api/emotionflix/chat/stream", methods=["POST"])
+def emotion_chat_stream():
+    """Chat with EmotionFlix, streaming the reply as server-sent events.
+
+    Each `data:` event carries {"delta": "<text>"}; the stream ends with an
+    `event: done` or, if the model call fails part-way, an `event: error`.
+    """
+    data = request.get_json(silent=True)
+    
+    if not data or "message" not in data:
+        return jsonify({"error": "Message required"}), 400
+    
+    user_message = data["message"]
+    selected_mood = data.get("mood", None)
+    if selected_mood:
+        app.logger.info(f"Chat with mood emoji: {selected_mood}")
+        user_message = f"Mood: {selected_mood}. {user_message}"
+    
+    try:
+        stream = emotion_flix.stream_emotionflix_response(user_message)
+    except emotion_flix.EmotionFlixBusy as exc:
+        return jsonify({"error": str(exc)}), 503, {"Retry-After": "5"}
+    except Exception as exc:
+        app.logger.error(f"EmotionFlix stream error: {exc}")
+        return jsonify({"error": str(exc)}), 500
+
+    def events():
+        try:
+            for delta in stream:
+                yield f"data: {json.dumps({'delta': delta})}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        except Exception as exc:
+            app.logger.error(f"EmotionFlix stream error: {exc}")
+            yield f"event: error\ndata: {json.dumps({'error': str(exc)})}\n\n"
+        finally:
+            stream.close()
+
+    response = Response(events(), mimetype="text/event-stream",
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    # a generator closed before its first next() skips its finally block, so
+    # the slot and the upstream call are also released when the response is
+    response.call_on_close(stream.close)
+    return response
+
+
+# ───────────────────────── OBSERVABILITY ────────────────────────
+@app.route("/metrics")
+def metrics_endpoint():
+    """Prometheus text exposition of stage timings, scan sizes and LLM usage."""
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
+@app.route("/debug/profile")
+def profile():
+    """Collapsed stacks sampled from this worker's request threads (?reset=1 clears them)."""
+    if profiler is None:
+        return jsonify({"error": "Profiler disabled; set PROFILE_INTERVAL_MS"}), 404
+    body = profiler.collapsed(reset=request.args.get("reset") == "1")
+    return Response(body, mimetype="text/plain", headers={"X-Profiler-Pid": str(os.getpid())})
+
+
 # ─────────────────────── FRONT‑END / FALLBACK ROUTE ─────────────
 # If you have a React build in ./frontend/build, serve it; otherwise
 # fall back to a Jinja template (index.html in ./templates).
@@ -0,0 +1,44 @@
+import os
+import hashlib
+import logging
+
+import numpy as np
+
+
+def dataset_hash(*paths, block_size=1 << 20):
+    """SHA-256 over the contents of the given files, in order."""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(block_size), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def default_artifact_path(ratings_path, filename):
+    """Default artifact location: next to ratings.csv."""
+    return os.path.join(os.path.dirname(ratings_path), filename)
+
+
+def load_artifact(path, version, data_hash, description, build):
+    """Open the .npz artifact at `path` and return build(data), or None if it is missing, stale or unreadable.
+
+    `data_hash` is a callable returning the hash of the data files the
+    artifact must have been built from; it is only called when the file
+    exists, so a caller can defer (and share) the cost of hashing.
+    `description` names the artifact in log messages.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path) as data:
+            if int(data["version"]) != version:
+                logging.warning(f"Ignoring {description} {path}: unsupported version")
+                return None
+            if str(data["data_hash"]) != data_hash():
+                logging.warning(f"Ignoring stale {description} {path}: data files changed")
+                return None
+            return build(data)
+    except Exception as e:
+        logging.error(f"Error loading {description} {path}: {e}")
+        return None
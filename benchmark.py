@@ -0,0 +1,399 @@
+# benchmark.py  ― parity check and timings for MovieRecommender hot paths
+# ---------------------------------------------------------------
+# Usage:  python benchmark.py [--seeds 200]
+import argparse
+import gc
+import logging
+import multiprocessing
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics.pairwise import cosine_similarity
+
+from content_model import ContentNeighbors, tags_path_for
+from factor_model import train_als
+from model import CONTENT_WEIGHT, LikeIndex, MovieRecommender
+
+
+def legacy_recommendations(ratings, movies, movie_id, min_rating=4, similarity_threshold=0.10,
+                           max_recommendations=10):
+    """Original full-table pandas implementation of get_recommendations, kept as a reference."""
+    similar_users = ratings[(ratings["movieId"] == movie_id) &
+                            (ratings["rating"] > min_rating)]["userId"].unique()
+    if len(similar_users) == 0:
+        return pd.DataFrame(columns=["score", "title", "genres"])
+
+    similar_user_recs = ratings[(ratings["userId"].isin(similar_users)) &
+                                (ratings["rating"] > min_rating)]["movieId"]
+    similar_user_recs = similar_user_recs.value_counts() / len(similar_users)
+    similar_user_recs = similar_user_recs[similar_user_recs > similarity_threshold]
+    if len(similar_user_recs) == 0:
+        return pd.DataFrame(columns=["score", "title", "genres"])
+
+    all_users = ratings[(ratings["movieId"].isin(similar_user_recs.index)) &
+                        (ratings["rating"] > min_rating)]
+    all_user_recs = all_users["movieId"].value_counts() / len(all_users["userId"].unique())
+
+    rec_percentages = pd.concat([similar_user_recs, all_user_recs], axis=1)
+    rec_percentages.columns = ["similar", "all"]
+    rec_percentages["score"] = rec_percentages["similar"] / rec_percentages["all"]
+    rec_percentages = rec_percentages.sort_values("score", ascending=False)
+
+    return rec_percentages.head(max_recommendations).merge(
+        movies, left_index=True, right_on="movieId")[["score", "movieId", "title", "genres"]]
+
+
+def frames(recommender):
+    """Rebuild the ratings/movies DataFrames the legacy implementation scans."""
+    ratings = pd.DataFrame({"userId": recommender.rating_user_ids, "movieId": recommender.rating_movie_ids,
+                            "rating": recommender.rating_values})
+    movies = pd.DataFrame({"movieId": recommender.movie_ids, "title": recommender.titles.take(range(len(recommender.titles))),
+                           "genres": recommender.genres.take(range(len(recommender.genres)))})
+    return ratings, movies
+
+
+def tfidf_search(recommender, title, max_results=5):
+    """Original brute-force search: cosine similarity against the whole TF-IDF matrix.
+
+    Unlike the original, titles with zero similarity are dropped so the results
+    compare fairly with the index, which never returns non-matching titles.
+    """
+    query_vec = recommender.vectorizer.transform([recommender._clean_title(title)])
+    similarity = cosine_similarity(query_vec, recommender.tfidf).flatten()
+    indices = np.argpartition(similarity, -max_results)[-max_results:]
+    indices = indices[np.argsort(-similarity[indices])]
+    return indices[similarity[indices] > 0]
+
+
+def search_queries(recommender, n_queries, rng):
+    """Build (kind, query, target row) triples: whole titles, typed prefixes and one-typo titles."""
+    queries = []
+    for row in rng.choice(len(recommender.titles), size=n_queries, replace=False):
+        # Drop the year suffix, as users rarely type it
+        words = recommender.clean_titles[row].split()[:-1] or recommender.clean_titles[row].split()
+        title = " ".join(words)
+        queries.append(("full", title, row))
+        queries.append(("prefix", title[:max(3, int(len(title) * 0.6))], row))
+        longest = max(range(len(words)), key=lambda i: len(words[i]))
+        word = words[longest]
+        if len(word) >= 4:
+            i = rng.integers(1, len(word) - 2)
+            typo = word[:i] + word[i + 1] + word[i] + word[i + 2:]
+            queries.append(("typo", " ".join(words[:longest] + [typo] + words[longest + 1:]), row))
+    return queries
+
+
+def compare_search(recommender, n_queries, rng):
+    """Report top-5 agreement, target hit rate and latency of the title index vs brute-force TF-IDF."""
+    queries = search_queries(recommender, n_queries, rng)
+    index_search = lambda q: recommender.title_index.search(recommender._clean_title(q), 5)
+    brute_search = lambda q: tfidf_search(recommender, q, 5)
+
+    for kind in ("full", "prefix", "typo"):
+        subset = [(q, row) for k, q, row in queries if k == kind]
+        overlap, index_hits, brute_hits = [], 0, 0
+        for query, row in subset:
+            index_top, brute_top = index_search(query), brute_search(query)
+            overlap.append(len(set(index_top) & set(brute_top)) / max(1, len(brute_top)))
+            index_hits += row in index_top
+            brute_hits += row in brute_top
+        print(f"search {kind:<7} n={len(subset):<5} top5 overlap={np.mean(overlap):.3f}  "
+              f"hit@5 index={index_hits / len(subset):.3f} tfidf={brute_hits / len(subset):.3f}")
+
+    report("search (title index)", time_calls(index_search, [q for _, q, _ in queries]))
+    report("search (tfidf scan)", time_calls(brute_search, [q for _, q, _ in queries]))
+
+
+def sample_seeds(recommender, n_seeds, rng):
+    """Pick distinct seed movie IDs among movies that have at least one rating."""
+    rated = np.unique(recommender.rating_movie_ids)
+    return rng.choice(rated, size=min(n_seeds, len(rated)), replace=False)
+
+
+def check_parity(recommender, seeds):
+    """Assert the sparse path returns the same scores as the legacy pandas path."""
+    ratings, movies = frames(recommender)
+    for movie_id in seeds:
+        new = recommender.get_recommendations(movie_id)
+        old = legacy_recommendations(ratings, movies, movie_id)
+        # The score sequence must match exactly; ties may be ordered differently
+        assert np.array_equal(new["score"].to_numpy(float), old["score"].to_numpy(float)), movie_id
+        if len(new) == 0:
+            continue
+        shared = set(new["movieId"]) & set(old["movieId"])
+        new_scores = new.set_index("movieId")["score"]
+        old_scores = old.set_index("movieId")["score"]
+        for rec_id in shared:
+            assert new_scores[rec_id] == old_scores[rec_id], (movie_id, rec_id)
+
+
+def time_calls(fn, seeds):
+    """Return per-call latencies in milliseconds."""
+    latencies = []
+    for arg in seeds:
+        start = time.perf_counter()
+        fn(arg)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.array(latencies)
+
+
+def report(name, latencies):
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    print(f"{name:<24} n={len(latencies):<5} p50={p50:8.3f}ms  p95={p95:8.3f}ms  p99={p99:8.3f}ms")
+
+
+def compare_batch(recommender, seeds, batch_size=100):
+    """Check batch results against single calls and time one batch against sequential calls."""
+    table, recommender.table = recommender.table, None
+    try:
+        batch = list(seeds[:batch_size])
+        for frame, movie_id in zip(recommender.get_recommendations_batch(batch), batch):
+            single = recommender.get_recommendations(movie_id)
+            assert frame.equals(single), movie_id
+
+        index = recommender._like_index(4)
+        timings = {}
+        for name, sequential, batched in [
+            ("scoring", lambda: [index.top(m, 0.10, 10) for m in batch], lambda: index.top_batch(batch, 0.10, 10)),
+            ("end-to-end", lambda: [recommender.get_recommendations(m) for m in batch],
+             lambda: recommender.get_recommendations_batch(batch)),
+        ]:
+            timings[name] = []
+            for fn in (sequential, batched):
+                start = time.perf_counter()
+                fn()
+                timings[name].append(time.perf_counter() - start)
+    finally:
+        recommender.table = table
+    for name, (sequential, batched) in timings.items():
+        print(f"{len(batch)} seeds {name:<11} sequential={sequential * 1000:7.1f}ms  batch={batched * 1000:7.1f}ms  "
+              f"({sequential / batched:.1f}x)")
+
+
+def check_ingest(recommender, seeds, rng, holdout=0.1):
+    """Ingest a held-out share of ratings incrementally, check parity with a full rebuild and time batches."""
+    user_ids, movie_ids, ratings = recommender.rating_user_ids, recommender.rating_movie_ids, recommender.rating_values
+    order = rng.permutation(len(user_ids))
+    base, stream = order[:int(len(order) * (1 - holdout))], order[int(len(order) * (1 - holdout)):]
+
+    index = LikeIndex(user_ids[base], movie_ids[base], ratings[base], 4)
+    latencies = {}
+    start_row = 0
+    for batch_size in (10, 100, 1000):
+        batch = stream[start_row:start_row + batch_size]
+        start = time.perf_counter()
+        index = index.with_ratings(user_ids[batch], movie_ids[batch], ratings[batch])
+        latencies[batch_size] = (time.perf_counter() - start) * 1000
+        start_row += batch_size
+    rest = stream[start_row:]
+    index = index.with_ratings(user_ids[rest], movie_ids[rest], ratings[rest])
+
+    full = LikeIndex(user_ids[order], movie_ids[order], ratings[order], 4)
+    for movie_id in seeds:
+        incremental, rebuilt = index.top(movie_id, 0.10, 10), full.top(movie_id, 0.10, 10)
+        assert (incremental is None) == (rebuilt is None), movie_id
+        if incremental is not None:
+            assert all(np.array_equal(a, b) for a, b in zip(incremental, rebuilt)), movie_id
+    print(f"ingest parity OK after {len(stream)} streamed ratings; batch cost " +
+          "  ".join(f"{size}={ms:.2f}ms" for size, ms in latencies.items()))
+    report("get_recommendations (delta)", time_calls(lambda m: index.top(m, 0.10, 10), seeds))
+
+
+def holdout_cases(recommender, rng, holdout=0.2, max_seed_likes=None):
+    """Split ratings into train and held-out likes; pair each held-out like with a seed.
+
+    The seed is a random movie the same user rated in train: one they liked,
+    or with `max_seed_likes` any rated movie with at most that many likes in
+    train (the seeds co-occurrence scoring struggles with). Returns the train
+    row indices and a list of (seed, held-out movie) pairs.
+    """
+    user_ids, movie_ids, ratings = recommender.rating_user_ids, recommender.rating_movie_ids, recommender.rating_values
+    liked = np.flatnonzero(ratings > 4)
+    test = liked[rng.random(len(liked)) < holdout]
+    train = np.setdiff1d(np.arange(len(ratings)), test)
+
+    if max_seed_likes is None:
+        pool = train[ratings[train] > 4]
+    else:
+        train_likes = pd.Series(movie_ids[train][ratings[train] > 4]).value_counts()
+        likes = train_likes.reindex(movie_ids[train], fill_value=0).to_numpy()
+        pool = train[likes <= max_seed_likes]
+    seeds_by_user = pd.Series(movie_ids[pool]).groupby(user_ids[pool]).apply(np.array)
+    cases = [(rng.choice(seeds_by_user[user_ids[i]]), movie_ids[i]) for i in test if user_ids[i] in seeds_by_user.index]
+    return train, cases
+
+
+def hit_rate(top, cases):
+    """Share of cases whose held-out movie is recommended for the seed, and share with any result."""
+    hits = covered = 0
+    for seed, held_out in cases:
+        result = top(seed)
+        if result is not None and len(result[0]):
+            covered += 1
+            hits += held_out in result[0]
+    return hits / len(cases), covered / len(cases)
+
+
+def compare_factors(recommender, rng, k=10):
+    """Train ALS on a held-out split and compare hit@k, coverage and latency with co-occurrence scoring."""
+    train, cases = holdout_cases(recommender, rng)
+    _, cold_cases = holdout_cases(recommender, rng, max_seed_likes=2)
+    user_ids, movie_ids, ratings = (a[train] for a in (recommender.rating_user_ids, recommender.rating_movie_ids,
+                                                        recommender.rating_values))
+    index = LikeIndex(user_ids, movie_ids, ratings, 4)
+    start = time.perf_counter()
+    factors = train_als(user_ids, movie_ids, ratings)
+    print(f"ALS training ({factors.params['factors']} factors, {factors.params['iterations']} iterations): "
+          f"{time.perf_counter() - start:.1f}s on {len(train)} ratings")
+
+    engines = {"cooccurrence": lambda seed: index.top(seed, 0.10, k), "als": lambda seed: factors.top(seed, k)}
+    for name, top in engines.items():
+        hits, coverage = hit_rate(top, cases)
+        cold_hits, cold_coverage = hit_rate(top, cold_cases)
+        print(f"{name:<13} hit@{k}={hits:.3f} coverage={coverage:.3f}  "
+              f"seeds with <=2 likes: hit@{k}={cold_hits:.3f} coverage={cold_coverage:.3f}  "
+              f"({len(cases)}/{len(cold_cases)} held-out likes)")
+        report(f"{name} top-{k}", time_calls(top, [seed for seed, _ in cases]))
+
+
+def compare_content(recommender, rng, k=10):
+    """Compare co-occurrence, content neighbours, the cold-seed fallback and the hybrid blend on a held-out split."""
+    train, cases = holdout_cases(recommender, rng)
+    _, cold_cases = holdout_cases(recommender, rng, max_seed_likes=2)
+    index = LikeIndex(recommender.rating_user_ids[train], recommender.rating_movie_ids[train],
+                      recommender.rating_values[train], 4)
+    tags_path = tags_path_for(recommender.movies_path)
+    start = time.perf_counter()
+    content = ContentNeighbors.build(recommender.movies_path, tags_path)
+    print(f"content neighbours ({'genres and tags' if tags_path else 'genres only'}): "
+          f"{time.perf_counter() - start:.1f}s, {len(content.neighbor_ids)} stored "
+          f"({(content.neighbor_ids.nbytes + content.scores.nbytes) / 2**20:.1f}MB)")
+
+    def fallback(seed):
+        top = index.top(seed, 0.10, k)
+        return top if top is not None and len(top[0]) else content.top(seed, k)
+
+    def hybrid(seed):
+        scored = index.score(seed, 0.10)
+        movie_ids, scores = (scored[0], scored[1] / scored[2]) if scored is not None else (np.zeros(0, int), np.zeros(0))
+        return content.blend(seed, movie_ids, scores, CONTENT_WEIGHT, k)
+
+    engines = {"cooccurrence": lambda seed: index.top(seed, 0.10, k), "content": lambda seed: content.top(seed, k),
+               "fallback": fallback, "hybrid": hybrid}
+    for name, top in engines.items():
+        hits, coverage = hit_rate(top, cases)
+        cold_hits, cold_coverage = hit_rate(top, cold_cases)
+        print(f"{name:<13} hit@{k}={hits:.3f} coverage={coverage:.3f}  "
+              f"seeds with <=2 likes: hit@{k}={cold_hits:.3f} coverage={cold_coverage:.3f}  "
+              f"({len(cases)}/{len(cold_cases)} held-out likes)")
+        report(f"{name} top-{k}", time_calls(top, [seed for seed, _ in cases]))
+
+
+def time_startup():
+    """Time MovieRecommender construction from CSV (cold) and from the binary data cache."""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        os.environ["MOVIE_DATA_CACHE"] = cache_dir
+        try:
+            start = time.perf_counter()
+            MovieRecommender()
+            cold = time.perf_counter() - start
+            start = time.perf_counter()
+            MovieRecommender()
+            cached = time.perf_counter() - start
+        finally:
+            del os.environ["MOVIE_DATA_CACHE"]
+    print(f"{'startup (CSV + cache write)':<28} {cold * 1000:9.1f}ms")
+    print(f"{'startup (data cache)':<28} {cached * 1000:9.1f}ms")
+
+
+def memory_usage():
+    """Rss, Pss and Private_Dirty of the current process in MB (Linux only)."""
+    usage = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            field, _, value = line.partition(":")
+            if field in ("Rss", "Pss", "Private_Dirty"):
+                usage[field] = int(value.split()[0]) / 1024
+    return usage
+
+
+def _forked_worker(recommender, seeds, queries, results):
+    """Serve a batch of requests against the inherited model and report memory usage."""
+    before = memory_usage()
+    for query in queries:
+        recommender.search_movies(query)
+    for movie_id in seeds:
+        recommender.get_recommendations(movie_id)
+    after = memory_usage()
+    results.put({"private_dirty_before": before["Private_Dirty"], **after})
+
+
+def time_forked_workers(recommender, seeds, n_workers):
+    """Mimic gunicorn preload: fork workers from a process holding the model and measure their memory."""
+    gc.freeze()
+    ctx = multiprocessing.get_context("fork")
+    results = ctx.Queue()
+    queries = recommender.titles.take(range(0, len(recommender.titles), max(1, len(recommender.titles) // 200)))
+    workers = [ctx.Process(target=_forked_worker, args=(recommender, seeds, queries, results))
+               for _ in range(n_workers)]
+    for worker in workers:
+        worker.start()
+    usage = [results.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+    gc.unfreeze()
+
+    master = memory_usage()
+    print(f"master: rss={master['Rss']:.1f}MB")
+    for i, u in enumerate(usage):
+        print(f"worker {i}: rss={u['Rss']:.1f}MB  pss={u['Pss']:.1f}MB  "
+              f"private_dirty={u['Private_Dirty']:.1f}MB (+{u['Private_Dirty'] - u['private_dirty_before']:.1f}MB serving)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark MovieRecommender hot paths")
+    parser.add_argument("--seeds", type=int, default=200, help="number of seed movies to sample")
+    parser.add_argument("--random-state", type=int, default=42)
+    parser.add_argument("--queries", type=int, default=500, help="number of titles to derive search queries from")
+    parser.add_argument("--startup", action="store_true", help="also time cold vs cached startup")
+    parser.add_argument("--factors", action="store_true",
+                        help="also compare ALS factors with co-occurrence on a held-out split")
+    parser.add_argument("--content", action="store_true",
+                        help="also compare tag/genre neighbours and the hybrid blend on a held-out split")
+    parser.add_argument("--fork-workers", type=int, default=0,
+                        help="fork this many preloaded workers and report their memory usage")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    rng = np.random.default_rng(args.random_state)
+    recommender = MovieRecommender()
+    seeds = sample_seeds(recommender, args.seeds, rng)
+    # Parity and timings are for collaborative scoring, without the content fallback
+    recommender.content = None
+
+    check_parity(recommender, seeds)
+    print(f"parity OK on {len(seeds)} seeds")
+
+    report("get_recommendations", time_calls(recommender.get_recommendations, seeds))
+    ratings, movies = frames(recommender)
+    report("legacy pandas", time_calls(
+        lambda movie_id: legacy_recommendations(ratings, movies, movie_id), seeds))
+    compare_batch(recommender, seeds)
+    check_ingest(recommender, seeds, rng)
+    compare_search(recommender, args.queries, rng)
+
+    if args.factors:
+        compare_factors(recommender, rng)
+    if args.content:
+        compare_content(recommender, rng)
+    if args.startup:
+        time_startup()
+    if args.fork_workers:
+        time_forked_workers(recommender, seeds, args.fork_workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+# benchsuite.py  ― latency, memory and startup benchmarks at several data scales
+# ---------------------------------------------------------------
+# Usage:  python benchsuite.py [--scales 1,10,100] [--http] [--mapreduce-workers 1,4,16] [--loader]
+#                             [--json out.json]
+#         python benchsuite.py --compare baseline.json new.json
+#
+# Scale 1 is the bundled ml-latest-small; scale N is a synthetic ratings table
+# N times larger, generated from the real one (see scale_ratings). Each scale
+# is measured in fresh processes so startup and peak RSS are not skewed by
+# earlier runs:
+#   cold    MovieRecommender() from CSV, including writing the data cache
+#   cached  MovieRecommender() from the data cache, then per-call latency of
+#           search_movies, get_recommendations, get_recommendations_batch and
+#           get_movie, of the JSON-encoding variants app.py serves from, and
+#           of uncached per-user recommendations (all and the heaviest raters)
+#           (live scoring; the precomputed table is disabled)
+# With --loader, loading ratings.csv with one read_csv (the legacy loader) is
+# compared with the streaming loader, unbounded and under a memory ceiling.
+# With --mapreduce-workers, the precomputed table build (a map-reduce over
+# user partitions, see cooccurrence.py) is timed at each worker count and
+# checked against the serial result.
+# With --http, loadtest.py's baseline and streaming scenarios also run against
+# each scale. Results are written as JSON; --compare reports p50/p99 changes
+# between two result files and exits non-zero on regressions.
+import argparse
+import datetime
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+BUNDLED_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "ml-latest-small")
+
+
+def scale_ratings(ratings, factor, rng, swap_fraction=0.2):
+    """Yield `factor` copies of the ratings table that together form a synthetic dataset.
+
+    Copy 0 is the real table. Every further copy re-numbers the users, then
+    moves `swap_fraction` of their ratings to movies drawn from the movie
+    popularity distribution, with values drawn from the rating distribution.
+    Users keep their rating counts and most of their co-likes, so the per-user,
+    per-movie and co-occurrence distributions scale up with the data.
+    """
+    movie_ids, movie_counts = np.unique(ratings["movieId"].to_numpy(), return_counts=True)
+    values, value_counts = np.unique(ratings["rating"].to_numpy(), return_counts=True)
+    max_user = int(ratings["userId"].max())
+    yield ratings
+    for copy in range(1, factor):
+        synthetic = ratings.copy()
+        synthetic["userId"] += copy * max_user
+        swap = rng.random(len(synthetic)) < swap_fraction
+        synthetic.loc[swap, "movieId"] = rng.choice(movie_ids, size=swap.sum(), p=movie_counts / movie_counts.sum())
+        synthetic.loc[swap, "rating"] = rng.choice(values, size=swap.sum(), p=value_counts / value_counts.sum())
+        yield synthetic.drop_duplicates(["userId", "movieId"])
+
+
+def synthetic_dataset(factor, work_dir, random_state=0):
+    """Directory holding movies.csv and a `factor`x ratings.csv, generated on first use."""
+    if factor == 1:
+        return BUNDLED_DATA
+    data_dir = os.path.join(work_dir, f"x{factor}-seed{random_state}")
+    if os.path.exists(os.path.join(data_dir, "ratings.csv")):
+        return data_dir
+
+    os.makedirs(data_dir, exist_ok=True)
+    shutil.copy(os.path.join(BUNDLED_DATA, "movies.csv"), data_dir)
+    ratings = pd.read_csv(os.path.join(BUNDLED_DATA, "ratings.csv"))
+    rng = np.random.default_rng(random_state)
+    tmp_path = os.path.join(data_dir, f"ratings.{os.getpid()}.tmp")
+    start = time.perf_counter()
+    for i, part in enumerate(scale_ratings(ratings, factor, rng)):
+        part.to_csv(tmp_path, mode="w" if i == 0 else "a", header=i == 0, index=False)
+    os.replace(tmp_path, os.path.join(data_dir, "ratings.csv"))
+    print(f"generated {factor}x ratings in {data_dir} ({time.perf_counter() - start:.1f}s)", file=sys.stderr)
+    return data_dir
+
+
+def latency_summary(latencies_ms):
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+    return {"n": len(latencies_ms), "mean_ms": round(float(np.mean(latencies_ms)), 4),
+            "p50_ms": round(float(p50), 4), "p95_ms": round(float(p95), 4), "p99_ms": round(float(p99), 4)}
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far (ru_maxrss is in KB on Linux)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(phase, n_seeds, n_queries, batch_size, random_state):
+    """Measure one phase in this process (run via --phase in a child); returns a JSON-able dict."""
+    import logging
+
+    from benchmark import sample_seeds, search_queries, time_calls
+    from model import MovieRecommender
+
+    logging.basicConfig(level=logging.ERROR)
+    start = time.perf_counter()
+    recommender = MovieRecommender()
+    result = {"startup_s": round(time.perf_counter() - start, 4)}
+    if phase == "cold":
+        result["peak_rss_mb"] = round(peak_rss_mb(), 1)
+        return result
+
+    recommender.table = None
+    rng = np.random.default_rng(random_state)
+    seeds = sample_seeds(recommender, n_seeds, rng)
+    queries = [q for _, q, _ in search_queries(recommender, n_queries, rng)]
+    batches = [seeds[i:i + batch_size] for i in range(0, len(seeds), batch_size)]
+    # Distinct users, so every call misses the per-user cache; the heaviest raters are timed separately
+    user_ids, rating_counts = np.unique(recommender.rating_user_ids, return_counts=True)
+    heaviest = user_ids[np.argsort(-rating_counts, kind="stable")[:10]]
+    users = np.setdiff1d(rng.choice(user_ids, size=min(n_seeds, len(user_ids)), replace=False), heaviest)
+    calls = {
+        "search_movies": time_calls(recommender.search_movies, queries),
+        "get_recommendations": time_calls(recommender.get_recommendations, seeds),
+        f"get_recommendations_batch[{batch_size}]": time_calls(recommender.get_recommendations_batch, batches),
+        "get_movie": time_calls(recommender.get_movie, seeds),
+        "search_movies_json": time_calls(recommender.search_movies_json, queries),
+        "get_recommendations_json": time_calls(recommender.get_recommendations_json, seeds),
+        "get_movie_json": time_calls(recommender.get_movie_json, seeds),
+        "get_user_recommendations_json": time_calls(recommender.get_user_recommendations_json, users.tolist()),
+        "get_user_recommendations_json[heaviest]": time_calls(recommender.get_user_recommendations_json,
+                                                              heaviest.tolist()),
+        "get_user_recommendations_json[cached]": time_calls(recommender.get_user_recommendations_json,
+                                                            heaviest.tolist()),
+    }
+    result.update({
+        "ratings": int(len(recommender.rating_values)),
+        "users": int(len(np.unique(recommender.rating_user_ids))),
+        "movies": int(len(recommender.movie_ids)),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "calls": {name: latency_summary(latencies) for name, latencies in calls.items()},
+    })
+    return result
+
+
+def measure_mapreduce(worker_counts, repeat=3):
+    """Time the precomputed table build serially and at each worker count; check the results are identical."""
+    import logging
+
+    from model import MovieRecommender
+    from recommendation_table import build_table
+
+    logging.basicConfig(level=logging.ERROR)
+    index = MovieRecommender()._like_index(4)
+    timings = {}
+    serial = None
+    for workers in [1] + [w for w in worker_counts if w != 1]:
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = build_table(index, 0.10, 50, workers=workers)
+            best = min(best, time.perf_counter() - start)
+        if serial is None:
+            serial = result
+        identical = all(np.array_equal(a, b) and a.dtype == b.dtype for a, b in zip(result, serial))
+        timings[str(workers)] = {"seconds": round(best, 4), "identical": bool(identical)}
+    children_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    return {"movies": int(len(index.movie_ids)), "nnz": int(index.csr.nnz), "workers": timings,
+            "peak_rss_mb": round(peak_rss_mb(), 1), "peak_worker_rss_mb": round(children_rss, 1)}
+
+
+def measure_loader(data_dir, mode, memory_limit_mb):
+    """Peak RSS and time of loading ratings.csv with the legacy single read_csv or the streaming loader."""
+    from ratings_loader import RATING_COLUMNS, load_ratings
+
+    path = os.path.join(data_dir, "ratings.csv")
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    if mode == "pandas":
+        ratings = pd.read_csv(path, usecols=list(RATING_COLUMNS), dtype=RATING_COLUMNS)
+        arrays = [ratings[column].to_numpy() for column in RATING_COLUMNS]
+        del ratings
+    else:
+        arrays = list(load_ratings(path, memory_limit=memory_limit_mb << 20 if mode == "limit" else None).values())
+    elapsed = time.perf_counter() - start
+    return {"seconds": round(elapsed, 4), "peak_rss_mb": round(peak_rss_mb() - baseline, 1),
+            "rows": int(len(arrays[0]))}
+
+
+def run_phase(phase, data_dir, cache_dir, args):
+    """Run one measurement phase in a fresh interpreter and return its result."""
+    env = dict(os.environ, MOVIE_DATA_DIR=data_dir, MOVIE_DATA_CACHE=cache_dir,
+               RECOMMENDATION_TABLE=os.path.join(cache_dir, "no-table.npz"))
+    command = [sys.executable, os.path.abspath(__file__), "--phase", phase, "--seeds", str(args.seeds),
+               "--queries", str(args.queries), "--batch-size", str(args.batch_size),
+               "--random-state", str(args.random_state), "--mapreduce-workers", args.mapreduce_workers or "1",
+               "--loader-memory-limit", str(args.loader_memory_limit)]
+    output = subprocess.run(command, env=env, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run_scale(factor, args):
+    data_dir = synthetic_dataset(factor, args.work_dir, args.random_state)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cold = run_phase("cold", data_dir, cache_dir, args)
+        result = run_phase("cached", data_dir, cache_dir, args)
+        result = {"startup_cold_s": cold["startup_s"], "peak_rss_cold_mb": cold["peak_rss_mb"],
+                  "startup_cached_s": result.pop("startup_s"), **result}
+        if args.mapreduce_workers:
+            result["mapreduce"] = run_phase("mapreduce", data_dir, cache_dir, args)
+        if args.loader:
+            result["loader"] = {mode: run_phase(f"loader-{mode}", data_dir, cache_dir, args)
+                                for mode in ("pandas", "stream", "limit")}
+        if args.http:
+            import loadtest
+
+            http_args = loadtest.build_parser().parse_args(
+                ["--scenarios", "baseline,streaming", "--duration", str(args.http_duration),
+                 "--data-dir", data_dir, "--start-timeout", "600"])
+            result["http"] = loadtest.run_scenarios(http_args, env={"MOVIE_DATA_CACHE": cache_dir})
+    return result
+
+
+def print_scale(factor, result):
+    print(f"scale {factor}x: {result['ratings']:,} ratings, {result['users']:,} users")
+    print(f"  startup   cold={result['startup_cold_s'] * 1000:9.1f}ms  cached={result['startup_cached_s'] * 1000:9.1f}ms")
+    print(f"  peak rss  cold={result['peak_rss_cold_mb']:9.1f}MB  cached+calls={result['peak_rss_mb']:9.1f}MB")
+    for name, stats in result["calls"].items():
+        print(f"  {name:<32} n={stats['n']:<5} p50={stats['p50_ms']:8.3f}ms  p95={stats['p95_ms']:8.3f}ms  "
+              f"p99={stats['p99_ms']:8.3f}ms")
+    if "loader" in result:
+        for mode, loader in result["loader"].items():
+            print(f"  ratings loader {mode:<7} {loader['seconds']:7.2f}s  peak rss +{loader['peak_rss_mb']:7.1f}MB")
+    if "mapreduce" in result:
+        mapreduce = result["mapreduce"]
+        serial = mapreduce["workers"]["1"]["seconds"]
+        print(f"  table build for {mapreduce['movies']:,} movies ({mapreduce['nnz']:,} likes), "
+              f"peak rss {mapreduce['peak_rss_mb']:.0f}MB parent / {mapreduce['peak_worker_rss_mb']:.0f}MB worker")
+        for workers, timing in mapreduce["workers"].items():
+            print(f"    workers={workers:<3} {timing['seconds']:8.3f}s  speedup={serial / timing['seconds']:5.2f}x  "
+                  f"identical={timing['identical']}")
+
+
+def metadata(args):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ""
+    return {"timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "commit": commit, "python": platform.python_version(), "numpy": np.__version__,
+            "pandas": pd.__version__, "machine": platform.machine(), "cpus": os.cpu_count(),
+            "args": {k: v for k, v in vars(args).items() if k not in ("phase", "compare")}}
+
+
+def compare(old_path, new_path, tolerance, min_delta_ms=0.05):
+    """Print p50/p99 changes between two result files; return the number of regressions."""
+    with open(old_path) as f:
+        old = json.load(f)["scales"]
+    with open(new_path) as f:
+        new = json.load(f)["scales"]
+    regressions = 0
+    for scale in sorted(set(old) & set(new), key=int):
+        print(f"scale {scale}x")
+        metrics = [(name, stat, old[scale]["calls"][name][stat], new[scale]["calls"][name][stat])
+                   for name in new[scale]["calls"] if name in old[scale]["calls"] for stat in ("p50_ms", "p99_ms")]
+        metrics += [(name[:-len("_s")], "ms", old[scale][name] * 1000, new[scale][name] * 1000)
+                    for name in ("startup_cold_s", "startup_cached_s")]
+        for name, stat, before, after in metrics:
+            regressed = after > before * (1 + tolerance) and after - before > min_delta_ms
+            regressions += regressed
+            print(f"  {name + ' ' + stat:<40} {before:10.3f}ms -> {after:10.3f}ms  "
+                  f"({(after - before) / before * 100 if before else 0:+6.1f}%){'  REGRESSION' if regressed else ''}")
+        before, after = old[scale]["peak_rss_mb"], new[scale]["peak_rss_mb"]
+        regressed = after > before * (1 + tolerance)
+        regressions += regressed
+        print(f"  {'peak_rss_mb':<40} {before:10.1f}MB -> {after:10.1f}MB{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark MovieRecommender at several data scales")
+    parser.add_argument("--scales", default="1,10,100", help="comma-separated ratings multipliers")
+    parser.add_argument("--seeds", type=int, default=200, help="number of seed movies to sample")
+    parser.add_argument("--queries", type=int, default=200, help="number of titles to derive search queries from")
+    parser.add_argument("--batch-size", type=int, default=50, help="seeds per get_recommendations_batch call")
+    parser.add_argument("--random-state", type=int, default=42)
+    parser.add_argument("--work-dir", default=os.path.join(tempfile.gettempdir(), "movie-benchsuite"),
+                        help="where synthetic datasets are generated (reused across runs)")
+    parser.add_argument("--http", action="store_true", help="also load-test the HTTP routes at each scale")
+    parser.add_argument("--http-duration", type=float, default=10, help="seconds per HTTP scenario")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="relative slowdown that --compare reports as a regression")
+    parser.add_argument("--mapreduce-workers", help="also time the table build's map-reduce at these comma-separated "
+                                                    "worker counts against the serial computation (e.g. 1,4,16)")
+    parser.add_argument("--loader", action="store_true",
+                        help="also compare peak RSS of the legacy and streaming ratings loaders")
+    parser.add_argument("--loader-memory-limit", type=int, default=64,
+                        help="memory ceiling (MB) for the streaming loader's 'limit' run "
+                             "(RATINGS_LOADER_MEMORY_MB: parsing and the rating arrays only)")
+    parser.add_argument("--phase", choices=("cold", "cached", "mapreduce", "loader-pandas", "loader-stream",
+                                            "loader-limit"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.phase and args.phase.startswith("loader-"):
+        print(json.dumps(measure_loader(os.environ["MOVIE_DATA_DIR"], args.phase[len("loader-"):],
+                                        args.loader_memory_limit)))
+        return
+    if args.phase == "mapreduce":
+        print(json.dumps(measure_mapreduce([int(w) for w in args.mapreduce_workers.split(",")])))
+        return
+    if args.phase:
+        print(json.dumps(measure(args.phase, args.seeds, args.queries, args.batch_size, args.random_state)))
+        return
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, args.tolerance) else 0)
+
+    results = {"meta": metadata(args), "scales": {}}
+    for factor in (int(s) for s in args.scales.split(",")):
+        results["scales"][str(factor)] = run_scale(factor, args)
+        print_scale(factor, results["scales"][str(factor)])
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+# build_content.py  ― offline build of the content-similarity neighbour table
+# ---------------------------------------------------------------
+# Usage:  python build_content.py [--top-k 50] [--block-size 512]
+#
+# Movies are described by their genres and the tags in tags.csv (when the
+# dataset has one). MovieRecommender loads the resulting artifact when it
+# exists and its data hash matches movies.csv/tags.csv, and then serves seeds
+# without collaborative recommendations from it and enables mode=hybrid.
+import argparse
+import logging
+import time
+
+from artifacts import default_artifact_path
+from content_model import CONTENT_FILENAME, ContentNeighbors, source_hash, tags_path_for
+from model import MovieRecommender
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute content-similar movies from tags and genres")
+    parser.add_argument("--output", help="artifact path (default: content.npz next to ratings.csv)")
+    parser.add_argument("--top-k", type=int, default=50, help="neighbours stored per movie")
+    parser.add_argument("--min-similarity", type=float, default=0.05, help="prune neighbours at or below this")
+    parser.add_argument("--block-size", type=int, default=512, help="movies per similarity block (bounds memory)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    recommender = MovieRecommender()
+    output = args.output or default_artifact_path(recommender.ratings_path, CONTENT_FILENAME)
+    tags_path = tags_path_for(recommender.movies_path)
+
+    start = time.perf_counter()
+    table = ContentNeighbors.build(recommender.movies_path, tags_path, k=args.top_k,
+                                   min_similarity=args.min_similarity, block_size=args.block_size)
+    table.save(output, source_hash(recommender.movies_path, tags_path))
+    logging.info(f"Wrote {len(table.neighbor_ids)} content neighbours for {len(table.movie_ids)} movies "
+                 f"({'genres and tags' if tags_path else 'genres only'}) to {output} "
+                 f"in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
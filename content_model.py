@@ -0,0 +1,153 @@
+import os
+import re
+import logging
+
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from artifacts import dataset_hash, load_artifact
+
+CONTENT_FILENAME = "content.npz"
+CONTENT_VERSION = 1
+TAGS_FILENAME = "tags.csv"
+
+
+def tags_path_for(movies_path):
+    """The tags file for a dataset, or None if it has none.
+
+    MOVIE_TAGS takes precedence; otherwise tags.csv next to movies.csv, then
+    in the unpacked ml-latest-small archive beside it (where data/ keeps it).
+    """
+    candidates = [os.getenv("MOVIE_TAGS"), os.path.join(os.path.dirname(movies_path), TAGS_FILENAME),
+                  os.path.join(os.path.dirname(movies_path), "ml-latest-small", TAGS_FILENAME)]
+    return next((path for path in candidates if path and os.path.exists(path)), None)
+
+
+def source_hash(movies_path, tags_path):
+    """Data hash the artifact is keyed by: movies.csv plus tags.csv if there is one."""
+    return dataset_hash(*[path for path in (movies_path, tags_path) if path is not None])
+
+
+def content_terms(movies, tags=None):
+    """One list of terms per movie: its genres as whole terms plus the words of every tag applied to it.
+
+    A tag applied by several users repeats its words, so widely agreed tags
+    weigh more.
+    """
+    terms = [[f"genre:{genre.lower()}" for genre in genres.split("|") if genre != "(no genres listed)"]
+             for genres in movies["genres"]]
+    if tags is not None and len(tags):
+        rows = pd.Index(movies["movieId"]).get_indexer(tags["movieId"])
+        for row, tag in zip(rows, tags["tag"].astype(str)):
+            if row >= 0:
+                terms[row].extend(re.findall(r"[a-z0-9]+", tag.lower()))
+    return terms
+
+
+def build_neighbors(movie_ids, terms, k=50, min_similarity=0.05, block_size=512):
+    """Top-k content neighbours of every movie by cosine similarity of TF-IDF term vectors.
+
+    Similarities are computed `block_size` rows at a time against all
+    movies, so peak memory is one block_size x movies dense block however
+    many movies there are. Neighbours at or below `min_similarity` are
+    pruned. Returns the CSR-style arrays (offsets, neighbor_ids, scores),
+    each row sorted by descending similarity with ties by movie ID.
+    """
+    vectorizer = TfidfVectorizer(analyzer=lambda doc: doc, sublinear_tf=True)
+    vectors = vectorizer.fit_transform(terms).astype(np.float32).tocsr()
+    vectors_t = vectors.T.tocsc()
+    movie_ids = np.asarray(movie_ids)
+
+    top = max(1, min(k, len(movie_ids) - 1))
+    lengths, neighbor_ids, scores = [], [], []
+    for start in range(0, len(movie_ids), block_size):
+        block = (vectors[start:start + block_size] @ vectors_t).toarray()
+        block[np.arange(len(block)), np.arange(start, start + len(block))] = 0
+        best = np.argpartition(-block, top - 1, axis=1)[:, :top]
+        for row, columns in enumerate(best):
+            columns = columns[block[row, columns] > min_similarity]
+            order = np.lexsort((movie_ids[columns], -block[row, columns]))
+            lengths.append(len(columns))
+            neighbor_ids.append(movie_ids[columns[order]])
+            scores.append(np.minimum(block[row, columns[order]], 1))
+        logging.debug(f"Content neighbours for {min(start + block_size, len(movie_ids))}/{len(movie_ids)} movies")
+
+    offsets = np.zeros(len(movie_ids) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return (offsets, np.concatenate(neighbor_ids).astype(np.int32),
+            np.concatenate(scores).astype(np.float32))
+
+
+class ContentNeighbors:
+    """Precomputed top-K content-similar movies per movie (tags + genres), stored CSR-style."""
+
+    def __init__(self, movie_ids, offsets, neighbor_ids, scores, k):
+        self.movie_ids = movie_ids
+        self.offsets = offsets
+        self.neighbor_ids = neighbor_ids
+        self.scores = scores
+        self.k = k
+
+        # Lookups are by movie ID; keep a sorted view when the IDs are not already sorted
+        self._order = np.argsort(movie_ids, kind="stable")
+        self._sorted_ids = movie_ids[self._order]
+
+    @classmethod
+    def build(cls, movies_path, tags_path=None, k=50, min_similarity=0.05, block_size=512):
+        """Build the neighbour table from movies.csv and (optionally) tags.csv."""
+        movies = pd.read_csv(movies_path, dtype={"movieId": np.int32})
+        tags = pd.read_csv(tags_path, usecols=["movieId", "tag"]) if tags_path is not None else None
+        terms = content_terms(movies, tags)
+        offsets, neighbor_ids, scores = build_neighbors(movies["movieId"].to_numpy(), terms, k, min_similarity,
+                                                        block_size)
+        return cls(movies["movieId"].to_numpy(), offsets, neighbor_ids, scores, k)
+
+    def save(self, path, data_hash):
+        """Write the neighbour table artifact."""
+        np.savez(path, version=CONTENT_VERSION, data_hash=data_hash, movie_ids=self.movie_ids,
+                 offsets=self.offsets, neighbor_ids=self.neighbor_ids, scores=self.scores, k=self.k)
+
+    @classmethod
+    def load_if_fresh(cls, path, data_hash):
+        """Load the artifact at `path`, or return None if it is missing, stale or unreadable (see load_artifact)."""
+        table = load_artifact(path, CONTENT_VERSION, data_hash, "content neighbours", lambda data: cls(
+            data["movie_ids"], data["offsets"], data["neighbor_ids"], data["scores"], int(data["k"])))
+        if table is not None:
+            logging.info(f"Loaded content neighbours for {len(table.movie_ids)} movies from {path}")
+        return table
+
+    def _row(self, movie_id):
+        i = np.searchsorted(self._sorted_ids, movie_id)
+        if i == len(self._sorted_ids) or self._sorted_ids[i] != movie_id:
+            return None
+        return self._order[i]
+
+    def top(self, movie_id, k):
+        """Return the top-k (movie_ids, scores) content neighbours of a movie, or None if it is unknown."""
+        row = self._row(movie_id)
+        if row is None:
+            return None
+        start = self.offsets[row]
+        end = min(self.offsets[row + 1], start + k)
+        return self.neighbor_ids[start:end].astype(np.int64), self.scores[start:end].astype(np.float64)
+
+    def blend(self, movie_id, movie_ids, scores, weight, k):
+        """Blend collaborative (movie_ids, scores) for a seed with its content neighbours.
+
+        Collaborative scores are scaled to [0, 1] by their maximum, content
+        scores are cosine similarities, and each candidate of either list
+        gets (1 - weight) * collaborative + weight * content, a missing score
+        counting as 0. Returns the top-k (movie_ids, scores), ties by movie ID.
+        """
+        content = self.top(movie_id, self.k)
+        content_ids, content_scores = content if content is not None else (movie_ids[:0], np.zeros(0))
+        movie_ids = np.asarray(movie_ids, dtype=np.int64)
+        if len(scores) and scores.max() > 0:
+            scores = scores / scores.max()
+
+        candidates, inverse = np.unique(np.concatenate([movie_ids, content_ids]), return_inverse=True)
+        blended = np.bincount(inverse, weights=np.concatenate([(1 - weight) * scores, weight * content_scores]),
+                              minlength=len(candidates))
+        order = np.lexsort((candidates, -blended))[:k]
+        return candidates[order], blended[order]
@@ -0,0 +1,109 @@
+import functools
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy import sparse
+
+# Seeds scored per round of map tasks; bounds the size of each partial and of their sum
+BLOCK_SEEDS = 256
+
+# Likes matrix shared with pool workers (set by the pool initializer)
+_worker_likes = None
+
+
+def _init_worker(likes):
+    global _worker_likes
+    _worker_likes = likes
+
+
+def partition_users(likes, n_partitions):
+    """Split the rows (users) of a CSR likes matrix into up to `n_partitions` contiguous ranges of about equal likes."""
+    targets = np.linspace(0, likes.nnz, n_partitions + 1)[1:-1]
+    cuts = np.searchsorted(likes.indptr, targets)
+    return np.unique(np.concatenate([[0], cuts, [likes.shape[0]]]))
+
+
+def co_likes(likes, first, last, start, end):
+    """Partial counts of seeds [start, end) over the users [first, last).
+
+    Returns (audience, co): how many of these users liked each seed, and a
+    seed x movie CSR matrix of how many of the seed's likers among them
+    liked each movie (duplicate likes of the seed count once).
+    """
+    part = likes[first:last]
+    seeds = part[:, start:end].T.tocsr()
+    seeds.data[:] = 1
+    return np.diff(seeds.indptr), (seeds @ part).tocsr()
+
+
+def candidate_audience(likes, first, last, candidates):
+    """How many of the users [first, last) liked any movie in each row of the `candidates` indicator."""
+    return np.diff((candidates @ likes[first:last].T).tocsr().indptr)
+
+
+def _co_likes_task(first, last, start, end):
+    return co_likes(_worker_likes, first, last, start, end)
+
+
+def _audience_task(first, last, candidates):
+    return candidate_audience(_worker_likes, first, last, candidates)
+
+
+def table_tops(likes, like_counts, similarity_threshold, k, workers=1, partitions=None, block_seeds=BLOCK_SEEDS):
+    """Yield the top-k (movie codes, scores) of every movie of a CSR likes matrix, in column order.
+
+    Scores and ranking are those of LikeIndex.top, computed by map-reduce
+    over users: the users are split into `partitions` contiguous ranges
+    (default: one per worker) and the seeds are taken `block_seeds` at a
+    time. For each block, every user partition maps to its partial
+    audience sizes and co-like counts (see co_likes), which are reduced
+    by summing; those give each seed's candidates. A second map counts,
+    per partition, the users who liked any of a seed's candidates. The
+    partitions hold disjoint users, so the sum is the number of distinct
+    such users. All counts are integers, so the result is identical to the
+    serial computation (workers=1, run in this process) for any number of
+    workers or partitions.
+    """
+    bounds = partition_users(likes, partitions or workers)
+    firsts, lasts = list(bounds[:-1]), list(bounds[1:])
+    n_movies = likes.shape[1]
+    pool = None
+    if workers > 1:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(likes,))
+        co_task, audience_task = _co_likes_task, _audience_task
+        run = pool.map
+    else:
+        co_task, audience_task = functools.partial(co_likes, likes), functools.partial(candidate_audience, likes)
+        run = map
+    try:
+        for start in range(0, n_movies, block_seeds):
+            end = min(start + block_seeds, n_movies)
+            n = len(firsts)
+            partials = list(run(co_task, firsts, lasts, [start] * n, [end] * n))
+            audience = sum(sizes for sizes, _ in partials)
+            co = sum((rows for _, rows in partials[1:]), partials[0][1]).tocsr()
+            co.sort_indices()
+
+            # Candidates: movies liked by more than the threshold share of the seed's audience
+            row_sizes = np.diff(co.indptr)
+            similar = co.data / np.repeat(audience, row_sizes)
+            keep = similar > similarity_threshold
+            cols = co.indices[keep]
+            similar = similar[keep]
+            seed_rows = np.repeat(np.arange(end - start), row_sizes)[keep]
+            offsets = np.zeros(end - start + 1, dtype=np.int64)
+            np.cumsum(np.bincount(seed_rows, minlength=end - start), out=offsets[1:])
+            candidates = sparse.csr_matrix((np.ones(len(cols), dtype=np.int32), cols, offsets),
+                                           shape=(end - start, n_movies))
+            n_audience = sum(run(audience_task, firsts, lasts, [candidates] * n))
+
+            for j in range(end - start):
+                row = slice(offsets[j], offsets[j + 1])
+                scores = similar[row] / (like_counts[cols[row]] / n_audience[j])
+                order = np.lexsort((cols[row], -scores))[:k]
+                yield cols[row][order], scores[order]
+            logging.debug(f"Scored seeds {start}-{end} over {n} user partitions")
+    finally:
+        if pool is not None:
+            pool.shutdown()
@@ -0,0 +1,133 @@
+import os
+import json
+import logging
+
+import numpy as np
+
+from artifacts import dataset_hash
+
+CACHE_VERSION = 3
+CACHE_DIRNAME = ".moviecache"
+MANIFEST = "manifest.json"
+
+
+class PackedStrings:
+    """Read-only string column stored as one UTF-8 buffer plus offsets.
+
+    Unlike an object-dtype column this holds no Python objects, so it can be
+    memory-mapped and shared copy-on-write between forked workers without
+    refcount updates dirtying its pages.
+    """
+
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+
+    @classmethod
+    def from_strings(cls, strings):
+        encoded = [s.encode("utf-8") for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        data = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return cls(data, offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.data[self.offsets[i]:self.offsets[i + 1]].tobytes().decode("utf-8")
+
+    def take(self, indices):
+        """Decode the strings at `indices` into a list."""
+        return [self[i] for i in indices]
+
+    def raw(self, i):
+        """The UTF-8 bytes of string `i`, without decoding."""
+        return self.data[self.offsets[i]:self.offsets[i + 1]].tobytes()
+
+
+def default_cache_dir(ratings_path):
+    """Default cache location: a hidden directory next to ratings.csv."""
+    return os.path.join(os.path.dirname(ratings_path), CACHE_DIRNAME)
+
+
+def source_key(*paths):
+    """Cheap fingerprint of the source files (size and modification time)."""
+    key = []
+    for path in paths:
+        stat = os.stat(path)
+        key.append([os.path.abspath(path), stat.st_size, stat.st_mtime_ns])
+    return key
+
+
+def load(cache_dir, movies_path, ratings_path):
+    """Memory-map the cached arrays, or return None if the cache is missing or stale."""
+    manifest_path = os.path.join(cache_dir, MANIFEST)
+    if not os.path.exists(manifest_path):
+        return None
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if manifest.get("version") != CACHE_VERSION or manifest.get("source") != source_key(movies_path, ratings_path):
+            logging.info(f"Data cache in {cache_dir} is stale, rebuilding")
+            return None
+        arrays = {name: np.load(os.path.join(cache_dir, f"{name}.npy"), mmap_mode="r")
+                  for name in manifest["arrays"]}
+    except Exception as e:
+        logging.warning(f"Could not read data cache in {cache_dir}: {e}")
+        return None
+    logging.info(f"Loaded data cache from {cache_dir}")
+    return arrays
+
+
+def save(cache_dir, movies_path, ratings_path, arrays):
+    """Write each array as .npy and the manifest last, so readers never see a partial cache.
+
+    Failures (e.g. a read-only data directory) are logged and otherwise ignored.
+    """
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        for name, array in arrays.items():
+            tmp_path = os.path.join(cache_dir, f"{name}.{os.getpid()}.tmp.npy")
+            np.save(tmp_path, np.asarray(array))
+            os.replace(tmp_path, os.path.join(cache_dir, f"{name}.npy"))
+
+        _write_manifest(cache_dir, {"version": CACHE_VERSION, "source": source_key(movies_path, ratings_path),
+                                    "arrays": sorted(arrays)})
+        logging.info(f"Wrote data cache to {cache_dir}")
+    except Exception as e:
+        logging.warning(f"Could not write data cache to {cache_dir}: {e}")
+
+
+def _write_manifest(cache_dir, manifest):
+    tmp_path = os.path.join(cache_dir, f"{MANIFEST}.{os.getpid()}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, os.path.join(cache_dir, MANIFEST))
+
+
+def data_hash(cache_dir, movies_path, ratings_path):
+    """dataset_hash of the source files, memoized in the cache manifest while they are unchanged.
+
+    Artifacts are keyed by this content hash, but reading all of ratings.csv
+    on every start would undo the memory-mapped warm start, so the digest is
+    stored next to the source key it was computed for and reused while the
+    files keep the same size and modification time.
+    """
+    manifest_path = os.path.join(cache_dir, MANIFEST)
+    source = source_key(movies_path, ratings_path)
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = None
+    if manifest is not None and manifest.get("source") == source and manifest.get("data_hash"):
+        return manifest["data_hash"]
+
+    digest = dataset_hash(movies_path, ratings_path)
+    if manifest is not None and manifest.get("version") == CACHE_VERSION and manifest.get("source") == source:
+        try:
+            _write_manifest(cache_dir, {**manifest, "data_hash": digest})
+        except OSError as e:
+            logging.warning(f"Could not record the data hash in {cache_dir}: {e}")
+    return digest
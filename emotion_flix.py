@@ -1,6 +1,12 @@
 import os
-from openai import OpenAI
+import time
+import queue
+import asyncio
+import threading
+from openai import OpenAI, AsyncOpenAI
 import logging
+from llm_cache import cache_from_env, cache_key
+import metrics
 
 # the newest OpenAI model is "gpt-4o" which was released May 13, 2024.
 # do not change this unless explicitly requested by the user
@@ -8,6 +14,48 @@ import logging
 # Initialize the OpenAI client
 client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
 
+# Cache of responses keyed on the normalized prompt and movie context
+# (EMOTIONFLIX_CACHE=memory|sqlite:<path>|off)
+response_cache = cache_from_env()
+
+MODEL = "gpt-4o"
+MAX_TOKENS = 500
+TEMPERATURE = 0.7
+
+# Streaming chat: seconds to wait for the API (per read), and how many streams
+# one process keeps open at once; keep this below the gunicorn thread count so
+# chat never takes every thread away from search and recommend requests
+REQUEST_TIMEOUT = float(os.getenv("EMOTIONFLIX_TIMEOUT", "30"))
+MAX_CONCURRENT_STREAMS = int(os.getenv("EMOTIONFLIX_CONCURRENCY", "4"))
+
+_stream_slots = threading.BoundedSemaphore(MAX_CONCURRENT_STREAMS)
+_loop_lock = threading.Lock()
+_loop = None
+_async_client = None
+
+LLM_SECONDS = metrics.Histogram("emotionflix_llm_seconds", "Duration of model calls, to the last token.",
+                                metrics.LATENCY_BUCKETS, ("mode", "outcome"))
+LLM_FIRST_TOKEN_SECONDS = metrics.Histogram("emotionflix_llm_first_token_seconds",
+                                            "Time from a streamed call to its first token.")
+LLM_TOKENS = metrics.Counter("emotionflix_llm_tokens_total", "Tokens reported by the API.", ("kind",))
+
+
+def _record_usage(usage):
+    if usage is not None:
+        LLM_TOKENS.inc(usage.prompt_tokens, "prompt")
+        LLM_TOKENS.inc(usage.completion_tokens, "completion")
+
+
+def _cache_metrics():
+    if response_cache is None:
+        return {}
+    stats = response_cache.stats()
+    return {f"emotionflix_cache_{name}_total": ("counter", f"Response cache {name}.", (), [[[], stats[name]]])
+            for name in ("hits", "misses", "expirations", "evictions")}
+
+
+metrics.register_collector(_cache_metrics)
+
 # System prompt for EmotionFlix
 EMOTION_FLIX_SYSTEM_PROMPT = """
 You are EmotionFlix, an empathetic movie recommendation assistant designed to understand users' emotional journeys and suggest perfect films for their mood.
@@ -46,6 +94,26 @@ FOLLOW-UP CARE:
 Remember that your ultimate purpose is not just suggesting movies, but being a compassionate guide through the user's emotional landscape, using film as a medium for reflection, healing, and joy.
 """
 
+def _build_messages(user_message, movie_context=None):
+    """Chat messages for a user message and optional movie context."""
+    messages = [
+        {"role": "system", "content": EMOTION_FLIX_SYSTEM_PROMPT}
+    ]
+    
+    # Add movie context if provided
+    if movie_context:
+        context_message = f"""
+        Available movie information:
+        {movie_context}
+        
+        Use these movies in your recommendations if they match the user's emotional needs.
+        """
+        messages.append({"role": "system", "content": context_message})
+    
+    # Add user message
+    messages.append({"role": "user", "content": user_message})
+    return messages
+
 def get_emotionflix_response(user_message, movie_context=None):
     """
     Generate a response from EmotionFlix based on the user's message and optional movie context.
@@ -58,37 +126,172 @@ def get_emotionflix_response(user_message, movie_context=None):
         str: EmotionFlix's response
     """
     try:
-        messages = [
-            {"role": "system", "content": EMOTION_FLIX_SYSTEM_PROMPT}
-        ]
-        
-        # Add movie context if provided
-        if movie_context:
-            context_message = f"""
-            Available movie information:
-            {movie_context}
-            
-            Use these movies in your recommendations if they match the user's emotional needs.
-            """
-            messages.append({"role": "system", "content": context_message})
+        key = cache_key(MODEL, MAX_TOKENS, TEMPERATURE, user_message, movie_context)
+        if response_cache is not None:
+            cached = response_cache.get(key)
+            if cached is not None:
+                return cached
         
-        # Add user message
-        messages.append({"role": "user", "content": user_message})
+        messages = _build_messages(user_message, movie_context)
         
         # Call the OpenAI API
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=messages,
-            max_tokens=500,
-            temperature=0.7
-        )
+        start = time.perf_counter()
+        try:
+            response = client.chat.completions.create(
+                model=MODEL,
+                messages=messages,
+                max_tokens=MAX_TOKENS,
+                temperature=TEMPERATURE
+            )
+        except Exception:
+            LLM_SECONDS.observe(time.perf_counter() - start, "sync", "error")
+            raise
+        LLM_SECONDS.observe(time.perf_counter() - start, "sync", "ok")
+        _record_usage(response.usage)
         
-        return response.choices[0].message.content
+        content = response.choices[0].message.content
+        if response_cache is not None and content:
+            response_cache.set(key, content)
+        return content
     
     except Exception as e:
         logging.error(f"Error getting EmotionFlix response: {str(e)}")
         return "I'm sorry, I'm having trouble connecting to my emotional intelligence module. Please try again later."
 
+class EmotionFlixBusy(Exception):
+    """Raised when every streaming slot in this process is in use."""
+
+
+def _event_loop():
+    """This process's background event loop and async client, started on first use.
+
+    The loop runs in a daemon thread and multiplexes every open stream over the
+    client's pooled connections.
+    """
+    global _loop, _async_client
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="emotionflix-loop", daemon=True).start()
+            _async_client = AsyncOpenAI(api_key=os.environ.get("OPENAI_API_KEY"),
+                                        timeout=REQUEST_TIMEOUT, max_retries=0)
+        return _loop, _async_client
+
+
+def _forget_event_loop():
+    """Drop the loop and client inherited from the parent: neither its thread nor its connections survive fork()."""
+    global _loop, _async_client, _loop_lock
+    _loop = _async_client = None
+    _loop_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_forget_event_loop)
+
+
+class ChatStream:
+    """Iterator over the text deltas of one streamed EmotionFlix reply.
+
+    The API call runs on the background event loop and hands deltas over a
+    queue, so the request thread only waits on the queue. Closing the stream
+    (or exhausting it) cancels the call and frees its slot; a complete reply is
+    stored in the response cache.
+    """
+
+    _DONE = object()
+
+    def __init__(self, messages, key, cached=None):
+        self.key = key
+        self._queue = queue.Queue()
+        self._parts = []
+        self._future = None
+        if cached is not None:
+            self._queue.put(cached)
+            self._queue.put(self._DONE)
+            return
+        loop, async_client = _event_loop()
+        self._future = asyncio.run_coroutine_threadsafe(self._produce(async_client, messages), loop)
+
+    async def _produce(self, async_client, messages):
+        start = time.perf_counter()
+        first_token = True
+        try:
+            stream = await async_client.chat.completions.create(
+                model=MODEL,
+                messages=messages,
+                max_tokens=MAX_TOKENS,
+                temperature=TEMPERATURE,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            async with stream:
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        if first_token:
+                            LLM_FIRST_TOKEN_SECONDS.observe(time.perf_counter() - start)
+                            first_token = False
+                        self._queue.put(chunk.choices[0].delta.content)
+                    _record_usage(chunk.usage)
+            LLM_SECONDS.observe(time.perf_counter() - start, "stream", "ok")
+            self._queue.put(self._DONE)
+        except asyncio.CancelledError:
+            LLM_SECONDS.observe(time.perf_counter() - start, "stream", "cancelled")
+            raise
+        except Exception as e:
+            LLM_SECONDS.observe(time.perf_counter() - start, "stream", "error")
+            self._queue.put(e)
+
+    def __iter__(self):
+        try:
+            while True:
+                item = self._queue.get(timeout=REQUEST_TIMEOUT)
+                if item is self._DONE:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                self._parts.append(item)
+                yield item
+            if self._future is not None and response_cache is not None and self._parts:
+                response_cache.set(self.key, "".join(self._parts))
+        finally:
+            self.close()
+
+    def close(self):
+        """Cancel the call and free its slot; safe to call more than once."""
+        future, self._future = self._future, None
+        if future is not None:
+            future.cancel()
+            _stream_slots.release()
+
+
+def stream_emotionflix_response(user_message, movie_context=None):
+    """
+    Start a streamed response from EmotionFlix.
+    
+    Args:
+        user_message (str): The user's message/query
+        movie_context (dict, optional): Context about available movies or recommendations
+        
+    Returns:
+        ChatStream: iterator over the response text as it is generated; a
+        cached response comes back as a single piece
+        
+    Raises:
+        EmotionFlixBusy: if MAX_CONCURRENT_STREAMS streams are already open
+    """
+    key = cache_key(MODEL, MAX_TOKENS, TEMPERATURE, user_message, movie_context)
+    if response_cache is not None:
+        cached = response_cache.get(key)
+        if cached is not None:
+            return ChatStream(None, key, cached=cached)
+    
+    if not _stream_slots.acquire(blocking=False):
+        raise EmotionFlixBusy("Too many EmotionFlix conversations in progress")
+    try:
+        return ChatStream(_build_messages(user_message, movie_context), key)
+    except Exception:
+        _stream_slots.release()
+        raise
+
 def get_movie_recommendations_with_emotion(user_emotion, movies_data):
     """
     Get movie recommendations with emotional context
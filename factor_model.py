@@ -0,0 +1,113 @@
+import logging
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from artifacts import load_artifact
+
+FACTORS_FILENAME = "factors.npz"
+FACTORS_VERSION = 1
+
+
+def _solve(fixed, matrix, regularization, alpha, batch_size=1024):
+    """One ALS half-step: the least-squares factors of every row of `matrix` given the fixed column factors.
+
+    Implicit-feedback ALS (Hu, Koren & Volinsky): every rated cell has
+    preference 1 and confidence 1 + alpha * rating, every other cell
+    preference 0 and confidence 1. Each row's normal equations only need the
+    factors of its rated columns on top of the shared Y'Y; rows are solved
+    `batch_size` at a time as one stacked solve.
+    """
+    n_rows, k = matrix.shape[0], fixed.shape[1]
+    gram = fixed.T @ fixed + regularization * np.eye(k)
+    factors = np.zeros((n_rows, k))
+    indptr, indices, data = matrix.indptr, matrix.indices, matrix.data
+    rows = np.flatnonzero(np.diff(indptr))
+    for batch in np.array_split(rows, max(1, -(-len(rows) // batch_size))):
+        a = np.empty((len(batch), k, k))
+        b = np.empty((len(batch), k))
+        for j, row in enumerate(batch):
+            cols = fixed[indices[indptr[row]:indptr[row + 1]]]
+            extra = alpha * data[indptr[row]:indptr[row + 1]]
+            # A_u = Y'Y + Y'(C_u - I)Y + reg*I and b_u = Y'C_u p_u
+            a[j] = gram + (cols.T * extra) @ cols
+            b[j] = (1 + extra) @ cols
+        factors[batch] = np.linalg.solve(a, b[:, :, None])[:, :, 0]
+    return factors
+
+
+def train_als(user_ids, movie_ids, ratings, factors=32, regularization=1.0, alpha=1.0, iterations=10,
+              random_state=0):
+    """Train user and item factors on the rating arrays with implicit-feedback ALS."""
+    user_codes, user_index = pd.factorize(np.asarray(user_ids), sort=True)
+    movie_codes, movie_index = pd.factorize(np.asarray(movie_ids), sort=True)
+    # Duplicate (user, movie) rows are summed into higher confidence
+    matrix = sparse.csr_matrix((np.asarray(ratings, dtype=np.float64), (user_codes, movie_codes)),
+                               shape=(len(user_index), len(movie_index)))
+    matrix_t = matrix.T.tocsr()
+
+    rng = np.random.default_rng(random_state)
+    item_factors = rng.normal(scale=0.01, size=(len(movie_index), factors))
+    for i in range(iterations):
+        user_factors = _solve(item_factors, matrix, regularization, alpha)
+        item_factors = _solve(user_factors, matrix_t, regularization, alpha)
+        logging.debug(f"ALS iteration {i + 1}/{iterations}")
+
+    params = {"factors": factors, "regularization": regularization, "alpha": alpha, "iterations": iterations}
+    return FactorModel(np.asarray(movie_index), item_factors.astype(np.float32),
+                       np.asarray(user_index), user_factors.astype(np.float32), params)
+
+
+class FactorModel:
+    """Low-rank user/item factors; similar movies by projecting item factors onto the seed's."""
+
+    def __init__(self, movie_ids, item_factors, user_ids, user_factors, params):
+        self.movie_ids = movie_ids
+        self.item_factors = item_factors
+        self.user_ids = user_ids
+        self.user_factors = user_factors
+        self.params = params
+
+        self.norms = np.linalg.norm(item_factors, axis=1)
+        self.has_factors = self.norms > 0
+
+    def save(self, path, data_hash):
+        """Write the factors artifact."""
+        np.savez(path, version=FACTORS_VERSION, data_hash=data_hash, movie_ids=self.movie_ids,
+                 item_factors=self.item_factors, user_ids=self.user_ids, user_factors=self.user_factors,
+                 **{f"param_{name}": value for name, value in self.params.items()})
+
+    @classmethod
+    def load_if_fresh(cls, path, data_hash):
+        """Load the artifact at `path`, or return None if it is missing, stale or unreadable (see load_artifact)."""
+        def build(data):
+            params = {name[len("param_"):]: data[name].item() for name in data.files if name.startswith("param_")}
+            return cls(data["movie_ids"], data["item_factors"], data["user_ids"], data["user_factors"], params)
+
+        model = load_artifact(path, FACTORS_VERSION, data_hash, "factor model", build)
+        if model is not None:
+            logging.info(f"Loaded {model.item_factors.shape[1]}-factor model for {len(model.movie_ids)} movies "
+                         f"from {path}")
+        return model
+
+    def top(self, movie_id, k):
+        """Return the top-k (movie_ids, scores) most similar to a seed, or None if it has no factors.
+
+        A movie's score is the length of its factor vector along the seed's
+        direction: cosine similarity scaled by the movie's factor norm, which
+        keeps rarely rated movies with noisy factors from crowding out well
+        supported ones. Ties are broken by ascending movie ID.
+        """
+        i = np.searchsorted(self.movie_ids, movie_id)
+        if i == len(self.movie_ids) or self.movie_ids[i] != movie_id or not self.has_factors[i]:
+            return None
+        scores = self.item_factors @ (self.item_factors[i] / self.norms[i])
+        scores[i] = -np.inf
+        scores[~self.has_factors] = -np.inf
+        k = min(k, int(self.has_factors.sum()) - 1)
+        if k <= 0:
+            return self.movie_ids[:0], scores[:0]
+        best = np.argpartition(-scores, k - 1)[:k]
+        order = np.lexsort((self.movie_ids[best], -scores[best]))
+        return self.movie_ids[best[order]], scores[best[order]].astype(np.float64)
@@ -0,0 +1,56 @@
+# gunicorn.conf.py  ― shared-model deployment settings
+# ---------------------------------------------------------------
+# Usage:  gunicorn main:app            (picks this file up automatically)
+#
+# With preload_app the MovieRecommender in app.py is built once in the master
+# process and workers inherit it through fork(). The model only holds numpy
+# arrays (memory-mapped from the data cache where possible) and no object
+# columns, so workers read it without copying pages; gc.freeze() keeps the
+# collector from touching the master's objects in every worker.
+#
+# Expected per-worker memory, measured with `python benchmark.py --fork-workers 8`
+# on ml-latest-small: RSS ~125 MB per worker, but only ~11 MB of it private
+# (Private_Dirty, ~9 MB of which is allocator growth from serving requests);
+# the rest — libraries and the model arrays — is shared with the master, so
+# PSS is 25-70 MB per worker. Private memory per worker does not grow with the
+# ratings table. Set GUNICORN_PRELOAD=0 to go back to one model per worker.
+#
+# Workers are threaded so a streaming EmotionFlix chat (/api/emotionflix/chat/
+# stream) occupies one thread, not the whole worker. Each process opens at most
+# EMOTIONFLIX_CONCURRENCY (default 4) streams at a time, so keep GUNICORN_THREADS
+# above it to leave threads for search and recommend requests.
+#
+# Every worker writes its metrics to METRICS_DIR (a fresh temp dir unless set)
+# and /metrics sums the files, so a scrape reports all workers together.
+# Background threads (metrics flusher, profiler, ratings tail) do not survive
+# fork(), so each worker starts its own once it has loaded the app.
+import gc
+import os
+import tempfile
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.getenv("WEB_CONCURRENCY", "8"))
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") == "1"
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+if not os.getenv("METRICS_DIR"):
+    os.environ["METRICS_DIR"] = tempfile.mkdtemp(prefix="movierec-metrics-")
+metrics_dir = os.environ["METRICS_DIR"]
+
+
+def on_starting(server):
+    # Counters start from zero with the server, so drop snapshots of processes from a previous run
+    from metrics import remove_stale_snapshots
+    remove_stale_snapshots(metrics_dir)
+
+
+def when_ready(server):
+    # Move everything allocated while preloading into the permanent generation
+    if preload_app:
+        gc.freeze()
+
+
+def post_worker_init(worker):
+    # Runs in each worker once the app is loaded, preloaded or not
+    from app import start_worker_threads
+    start_worker_threads()
@@ -0,0 +1,156 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+
+def cache_key(*parts):
+    """Stable key for a request: whitespace-collapsed, case-folded text parts hashed together.
+
+    Prompts assembled from templates differ only in indentation and casing
+    from one request to the next, so both are normalized away.
+    """
+    normalized = [re.sub(r"\s+", " ", str(part or "")).strip().casefold() for part in parts]
+    return hashlib.sha256(json.dumps(normalized).encode("utf-8")).hexdigest()
+
+
+class MemoryBackend:
+    """In-process LRU store with per-entry expiry."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, now):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, False
+            value, expires_at = entry
+            if expires_at <= now:
+                del self._entries[key]
+                return None, True
+            self._entries.move_to_end(key)
+            return value, False
+
+    def set(self, key, value, expires_at):
+        """Store a value and return how many entries were evicted to make room."""
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            evicted = 0
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+            return evicted
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SqliteBackend:
+    """On-disk store shared by every worker on the host, LRU by last access time."""
+
+    def __init__(self, path, max_entries=10_000):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._pid = None
+        self._conn = None
+        with self._connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+
+    def _connection(self):
+        # sqlite connections must not cross fork(), so each process opens its own
+        if self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+            self._pid = os.getpid()
+        return self._conn
+
+    def get(self, key, now):
+        with self._lock, self._connection() as conn:
+            row = conn.execute("SELECT value, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None, False
+            value, expires_at = row
+            if expires_at <= now:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None, True
+            conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            return value, False
+
+    def set(self, key, value, expires_at):
+        """Store a value and return how many entries were evicted to make room."""
+        now = time.time()
+        with self._lock, self._connection() as conn:
+            conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)", (key, value, expires_at, now))
+            conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+            cursor = conn.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+            return cursor.rowcount
+
+    def __len__(self):
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+class ResponseCache:
+    """Bounded TTL cache for LLM responses with hit/miss counters."""
+
+    def __init__(self, backend, ttl=3600):
+        self.backend = backend
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+
+    def get(self, key):
+        value, expired = self.backend.get(key, time.time())
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                self.expirations += expired
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key, value):
+        evicted = self.backend.set(key, value, time.time() + self.ttl)
+        with self._lock:
+            self.evictions += evicted
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "expirations": self.expirations,
+            "evictions": self.evictions,
+            "entries": len(self.backend),
+        }
+
+
+def cache_from_env():
+    """Build the cache configured by EMOTIONFLIX_CACHE ("memory", "sqlite:<path>" or "off")."""
+    spec = os.getenv("EMOTIONFLIX_CACHE", "memory")
+    ttl = float(os.getenv("EMOTIONFLIX_CACHE_TTL", "3600"))
+    max_entries = int(os.getenv("EMOTIONFLIX_CACHE_SIZE", "1024"))
+    if spec == "off":
+        return None
+    if spec.startswith("sqlite:"):
+        path = spec[len("sqlite:"):]
+        logging.info(f"Caching EmotionFlix responses in {path}")
+        return ResponseCache(SqliteBackend(path, max_entries), ttl)
+    return ResponseCache(MemoryBackend(max_entries), ttl)
@@ -0,0 +1,260 @@
+# loadtest.py  ― HTTP load test of search/recommend latency under chat load
+# ---------------------------------------------------------------
+# Usage:  python loadtest.py [--duration 15] [--chat-clients 8] [--json out.json]
+#
+# Starts a stub OpenAI-compatible server that streams a canned reply slowly,
+# then runs gunicorn (pointed at the stub through OPENAI_BASE_URL) in three
+# configurations and measures /api/search, /api/recommend and
+# /api/direct-recommend latency from concurrent clients:
+#   baseline   threaded workers, no chat traffic
+#   blocking   sync workers, chat clients on /api/emotionflix/chat
+#   streaming  threaded workers, chat clients on /api/emotionflix/chat/stream
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+SEARCH_QUERIES = ["toy story", "star wars", "matrix", "godfather", "lord of the ri",
+                  "termin", "jurassic", "titanic", "pulp fict", "forrest"]
+SEED_MOVIE_IDS = [1, 260, 296, 318, 356, 480, 527, 589, 593, 2571, 2959, 4993]
+
+
+class StubLLMHandler(BaseHTTPRequestHandler):
+    """Minimal /v1/chat/completions: a fixed reply, `tokens` pieces `delay` seconds apart."""
+
+    tokens = 40
+    delay = 0.05
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        pieces = [f"word{i} " for i in range(self.tokens)]
+        if not body.get("stream"):
+            time.sleep(self.delay * self.tokens)
+            self._send_json({
+                "id": "stub", "object": "chat.completion", "created": int(time.time()), "model": "stub",
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": "".join(pieces)}}],
+                "usage": self._usage(),
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for piece in pieces:
+                time.sleep(self.delay)
+                self._send_chunk(piece)
+            self._send_chunk(None)
+            if (body.get("stream_options") or {}).get("include_usage"):
+                usage = {"id": "stub", "object": "chat.completion.chunk", "created": int(time.time()),
+                         "model": "stub", "choices": [], "usage": self._usage()}
+                self._write(f"data: {json.dumps(usage)}\n\n".encode())
+            self._write(b"data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _send_chunk(self, content):
+        delta = {"content": content} if content is not None else {}
+        chunk = {"id": "stub", "object": "chat.completion.chunk", "created": int(time.time()), "model": "stub",
+                 "choices": [{"index": 0, "delta": delta, "finish_reason": None if content else "stop"}]}
+        self._write(f"data: {json.dumps(chunk)}\n\n".encode())
+
+    def _usage(self):
+        return {"prompt_tokens": 100, "completion_tokens": self.tokens, "total_tokens": 100 + self.tokens}
+
+    def _write(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_json(self, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def start_stub(port, tokens, delay):
+    StubLLMHandler.tokens = tokens
+    StubLLMHandler.delay = delay
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubLLMHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+SCENARIOS = {
+    "baseline": ((), None),
+    "blocking": (("--worker-class", "sync", "--threads", "1"), "/api/emotionflix/chat"),
+    "streaming": ((), "/api/emotionflix/chat/stream"),
+}
+
+
+def start_app(port, stub_port, workers, extra_args=(), env=None, timeout=60):
+    """Run gunicorn against the stub LLM and wait until it answers."""
+    env = dict(os.environ, **(env or {}),
+               GUNICORN_BIND=f"127.0.0.1:{port}",
+               WEB_CONCURRENCY=str(workers),
+               OPENAI_BASE_URL=f"http://127.0.0.1:{stub_port}/v1",
+               OPENAI_API_KEY="stub",
+               EMOTIONFLIX_CACHE="off")
+    process = subprocess.Popen([sys.executable, "-m", "gunicorn", "main:app", *extra_args],
+                               env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/api/search?query=toy", timeout=1).read()
+            return process
+        except (urllib.error.URLError, ConnectionError, TimeoutError):
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("gunicorn did not start")
+
+
+def api_client(base, stop, latencies, rng):
+    """Mix search, recommend and direct-recommend requests until `stop` is set, recording latency per endpoint."""
+    while not stop.is_set():
+        endpoint = rng.choice(("search", "recommend", "direct"))
+        if endpoint == "recommend":
+            url = f"{base}/api/recommend?movieId={rng.choice(SEED_MOVIE_IDS)}"
+        else:
+            path = "/api/search" if endpoint == "search" else "/api/direct-recommend"
+            url = f"{base}{path}?query={urllib.request.quote(rng.choice(SEARCH_QUERIES))}"
+        start = time.perf_counter()
+        try:
+            urllib.request.urlopen(url, timeout=60).read()
+        except Exception:
+            latencies.setdefault("errors", []).append(1)
+            continue
+        latencies.setdefault(endpoint, []).append(time.perf_counter() - start)
+
+
+def chat_client(base, path, stop, latencies):
+    """Send chat messages until `stop` is set, recording time to first byte and to the full reply."""
+    body = json.dumps({"message": "I feel nostalgic tonight"}).encode()
+    while not stop.is_set():
+        request = urllib.request.Request(f"{base}{path}", data=body, headers={"Content-Type": "application/json"})
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=120) as response:
+                response.read(1)
+                latencies.setdefault("chat_first", []).append(time.perf_counter() - start)
+                response.read()
+        except urllib.error.HTTPError as e:
+            # 503 when the per-process stream limit is reached
+            latencies.setdefault(f"chat_{e.code}", []).append(1)
+            time.sleep(0.5)
+            continue
+        except Exception:
+            latencies.setdefault("errors", []).append(1)
+            continue
+        latencies.setdefault("chat_total", []).append(time.perf_counter() - start)
+
+
+def run_load(base, duration, api_clients, chat_clients, chat_path, seed=0):
+    stop = threading.Event()
+    latencies = {}
+    threads = [threading.Thread(target=api_client, args=(base, stop, latencies, random.Random(seed + i)))
+               for i in range(api_clients)]
+    threads += [threading.Thread(target=chat_client, args=(base, chat_path, stop, latencies))
+                for _ in range(chat_clients if chat_path else 0)]
+    for t in threads:
+        t.start()
+    time.sleep(duration)
+    stop.set()
+    for t in threads:
+        t.join()
+    return latencies
+
+
+def summarize(latencies):
+    summary = {}
+    for name, values in sorted(latencies.items()):
+        if name in ("errors",) or name.startswith("chat_") and name[5:].isdigit():
+            summary[name] = len(values)
+            continue
+        ms = np.array(values) * 1000
+        summary[name] = {"n": len(ms), "p50_ms": round(float(np.percentile(ms, 50)), 1),
+                         "p99_ms": round(float(np.percentile(ms, 99)), 1)}
+    return summary
+
+
+def report(name, summary):
+    print(f"{name}:")
+    for endpoint, stats in summary.items():
+        if isinstance(stats, dict):
+            print(f"  {endpoint:<11} n={stats['n']:<6} p50 {stats['p50_ms']:8.1f} ms   p99 {stats['p99_ms']:8.1f} ms")
+        else:
+            print(f"  {endpoint:<11} {stats}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Load-test the Flask routes against a stub LLM")
+    parser.add_argument("--duration", type=float, default=15, help="seconds of load per scenario")
+    parser.add_argument("--scenarios", default="baseline,blocking,streaming",
+                        help=f"comma-separated subset of {', '.join(SCENARIOS)}")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn worker processes")
+    parser.add_argument("--api-clients", type=int, default=4, help="concurrent search/recommend clients")
+    parser.add_argument("--chat-clients", type=int, default=8, help="concurrent chat clients")
+    parser.add_argument("--stub-tokens", type=int, default=40, help="pieces in each stub reply")
+    parser.add_argument("--stub-delay", type=float, default=0.05, help="seconds between stub pieces")
+    parser.add_argument("--data-dir", help="serve movies.csv/ratings.csv from this directory (MOVIE_DATA_DIR)")
+    parser.add_argument("--start-timeout", type=float, default=60, help="seconds to wait for gunicorn to start")
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--stub-port", type=int, default=5056)
+    parser.add_argument("--json", help="also write the results to this file")
+    return parser
+
+
+def run_scenarios(args, env=None):
+    """Run each scenario in `args.scenarios` against a fresh gunicorn and return the summaries."""
+    env = dict(env or {})
+    if args.data_dir:
+        env["MOVIE_DATA_DIR"] = args.data_dir
+    stub = start_stub(args.stub_port, args.stub_tokens, args.stub_delay)
+    base = f"http://127.0.0.1:{args.port}"
+    results = {}
+    try:
+        for name in filter(None, args.scenarios.split(",")):
+            extra_args, chat_path = SCENARIOS[name]
+            process = start_app(args.port, args.stub_port, args.workers, extra_args, env, args.start_timeout)
+            try:
+                latencies = run_load(base, args.duration, args.api_clients, args.chat_clients, chat_path)
+            finally:
+                process.terminate()
+                process.wait()
+            results[name] = summarize(latencies)
+            report(name, results[name])
+    finally:
+        stub.shutdown()
+        stub.server_close()
+    return results
+
+
+def main():
+    args = build_parser().parse_args()
+    results = run_scenarios(args)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
-from app import app  # noqa: F401
+from app import app, start_worker_threads  # noqa: F401
 
 if __name__ == "__main__":
+    start_worker_threads()
     app.run(host="0.0.0.0", port=5000, debug=True)
@@ -0,0 +1,248 @@
+import os
+import json
+import time
+import logging
+import threading
+from bisect import bisect_left
+
+# Histogram buckets for durations (seconds) and for row/candidate counts
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (1, 10, 100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+# Seconds between snapshots written to METRICS_DIR, and the name of each process's
+# snapshot there (SNAPSHOT_PREFIX + pid + ".json"); other files in it are left alone
+FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "5"))
+SNAPSHOT_PREFIX = "movierec-metrics-"
+
+_registry = []
+_collectors = []
+
+
+class Counter:
+    """Monotonic counter with optional labels (passed positionally, in `labelnames` order)."""
+
+    type = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount=1, *labels):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(labels), value] for labels, value in self._values.items()]
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels, as in the Prometheus data model."""
+
+    type = "histogram"
+
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS, labelnames=()):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value, *labels):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][i] += 1
+            series[1] += value
+
+    def time(self, *labels):
+        """Context manager observing the wall time of its block."""
+        return _Timer(self, labels)
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(labels), [list(counts), total]] for labels, (counts, total) in self._series.items()]
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+
+
+def register_collector(collect):
+    """Add a callable returning {name: (type, help, labelnames, [[labels, value], ...])} read at scrape time.
+
+    For values kept elsewhere (e.g. the LLM cache counters); they are merged
+    across processes like everything else, so report counters, not gauges.
+    """
+    _collectors.append(collect)
+
+
+# Stage timings and sizes shared by model.py, app.py and emotion_flix.py
+STAGE_SECONDS = Histogram("movierec_stage_seconds", "Time spent in each request stage.",
+                          LATENCY_BUCKETS, ("stage",))
+ROWS_SCANNED = Histogram("movierec_rows_scanned", "Index entries read per call, by what was scanned.",
+                         SIZE_BUCKETS, ("scan",))
+CANDIDATES = Histogram("movierec_candidates", "Candidate set size per call.", SIZE_BUCKETS, ("stage",))
+RECOMMENDATION_SOURCE = Counter("movierec_recommendations_total",
+                                "Recommendation lists served, by source (table, live, factors, content, ...).",
+                                ("source",))
+
+
+def stage(name):
+    """Time a block as stage `name` of the stage histogram."""
+    return _Timer(STAGE_SECONDS, (name,))
+
+
+def snapshot():
+    """Every metric of this process as a JSON-able dict."""
+    metrics = {}
+    for metric in _registry:
+        metrics[metric.name] = {"type": metric.type, "help": metric.help, "labelnames": list(metric.labelnames),
+                                "buckets": list(getattr(metric, "buckets", [])), "series": metric.snapshot()}
+    for collect in _collectors:
+        try:
+            collected = collect()
+        except Exception as e:
+            logging.warning(f"Metrics collector failed: {e}")
+            continue
+        for name, (type_, help, labelnames, series) in collected.items():
+            metrics[name] = {"type": type_, "help": help, "labelnames": list(labelnames), "buckets": [],
+                             "series": series}
+    return metrics
+
+
+def _merge(snapshots):
+    """Sum the series of several snapshots (one per process)."""
+    merged = {}
+    for metrics in snapshots:
+        for name, metric in metrics.items():
+            target = merged.setdefault(name, {**metric, "series": {}})
+            for labels, value in metric["series"]:
+                key = tuple(labels)
+                if metric["type"] == "histogram":
+                    counts, total = target["series"].get(key, ([0] * len(value[0]), 0.0))
+                    target["series"][key] = ([a + b for a, b in zip(counts, value[0])], total + value[1])
+                else:
+                    target["series"][key] = target["series"].get(key, 0) + value
+    return merged
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render():
+    """Text exposition format of all metrics, summed over every process sharing METRICS_DIR."""
+    metrics_dir = os.getenv("METRICS_DIR")
+    if metrics_dir:
+        flush(metrics_dir)
+        snapshots = []
+        for filename in os.listdir(metrics_dir):
+            if filename.startswith(SNAPSHOT_PREFIX) and filename.endswith(".json"):
+                try:
+                    with open(os.path.join(metrics_dir, filename)) as f:
+                        snapshots.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+        merged = _merge(snapshots)
+    else:
+        merged = _merge([snapshot()])
+
+    lines = []
+    for name, metric in sorted(merged.items()):
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        labelnames = metric["labelnames"]
+        for labels, value in sorted(metric["series"].items()):
+            if metric["type"] != "histogram":
+                lines.append(f"{name}{_format_labels(labelnames, labels)} {_format_number(value)}")
+                continue
+            counts, total = value
+            cumulative = 0
+            for bound, count in zip(list(metric["buckets"]) + [float("inf")], counts):
+                cumulative += count
+                le = (("le", _format_number(bound if bound == float("inf") else float(bound))),)
+                lines.append(f"{name}_bucket{_format_labels(labelnames, labels, le)} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labelnames, labels)} {_format_number(float(total))}")
+            lines.append(f"{name}_count{_format_labels(labelnames, labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+def flush(metrics_dir):
+    """Write this process's snapshot to `metrics_dir` (atomically, one file per pid)."""
+    path = os.path.join(metrics_dir, f"{SNAPSHOT_PREFIX}{os.getpid()}.json")
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, "w") as f:
+            json.dump(snapshot(), f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logging.warning(f"Could not write metrics to {metrics_dir}: {e}")
+
+
+def remove_stale_snapshots(metrics_dir):
+    """Delete the snapshots in `metrics_dir` of processes that are no longer running.
+
+    For a server starting up, so its counters start from zero; snapshots of
+    live processes (another server sharing the directory) are kept.
+    """
+    for filename in os.listdir(metrics_dir):
+        pid = filename[len(SNAPSHOT_PREFIX):].split(".", 1)[0]
+        if not filename.startswith(SNAPSHOT_PREFIX) or not pid.isdigit():
+            continue
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            os.remove(os.path.join(metrics_dir, filename))
+        except PermissionError:
+            pass  # alive, owned by another user
+
+
+def start_flusher():
+    """Snapshot this process's metrics to METRICS_DIR every FLUSH_INTERVAL seconds.
+
+    Each gunicorn worker keeps its own metrics; with METRICS_DIR set they all
+    write there and /metrics sums the files, so a scrape served by any worker
+    reports the totals. Files of exited workers are kept so counters never go
+    backwards. Call once per process; does nothing without METRICS_DIR.
+    """
+    metrics_dir = os.getenv("METRICS_DIR")
+    if not metrics_dir:
+        return
+
+    def run():
+        while True:
+            time.sleep(FLUSH_INTERVAL)
+            flush(metrics_dir)
+
+    threading.Thread(target=run, name="metrics-flush", daemon=True).start()
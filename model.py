@@ -1,10 +1,455 @@
 import os
+import json
+import copy
+import hashlib
+import threading
 import pandas as pd
 import numpy as np
 import re
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from scipy import sparse
 import logging
+import data_cache
+from data_cache import PackedStrings
+from ratings_loader import load_ratings
+from search_index import TitleIndex
+from artifacts import default_artifact_path
+from recommendation_table import RecommendationTable, TABLE_FILENAME
+from factor_model import FactorModel, FACTORS_FILENAME
+from content_model import ContentNeighbors, CONTENT_FILENAME, source_hash, tags_path_for
+from llm_cache import MemoryBackend
+from metrics import stage, ROWS_SCANNED, CANDIDATES, RECOMMENDATION_SOURCE
+
+
+class LikeDelta:
+    """Append-only log of likes added after a LikeIndex's matrices were built.
+
+    Snapshots share the log arrays but only read their first `n` entries, so
+    appending for a newer snapshot never changes what an older one sees.
+    """
+
+    def __init__(self, capacity=1024):
+        self.users = np.empty(capacity, dtype=np.int64)
+        self.movies = np.empty(capacity, dtype=np.int64)
+        self.n = 0
+        # Codes of users/movies that are not in the base matrices, in order of arrival
+        self.user_codes = {}
+        self.movie_codes = {}
+        self.new_movie_ids = []
+
+    def appended(self, user_codes, movie_codes):
+        """Return a delta with these likes appended, reusing the log arrays when they have room."""
+        delta = copy.copy(self)
+        n = self.n + len(user_codes)
+        if n > len(self.users):
+            capacity = max(n, 2 * len(self.users))
+            delta.users = np.empty(capacity, dtype=np.int64)
+            delta.movies = np.empty(capacity, dtype=np.int64)
+            delta.users[:self.n] = self.users[:self.n]
+            delta.movies[:self.n] = self.movies[:self.n]
+        delta.users[self.n:n] = user_codes
+        delta.movies[self.n:n] = movie_codes
+        delta.n = n
+        return delta
+
+
+class LikeIndex:
+    """Sparse user x movie matrices of ratings strictly above a threshold.
+
+    Ratings ingested after the matrices were built live in a LikeDelta; see
+    `with_ratings`.
+    """
+
+    def __init__(self, user_ids, movie_ids, ratings, min_rating):
+        """Build CSR/CSC "liked" matrices from parallel rating arrays."""
+        liked = np.asarray(ratings) > min_rating
+        user_codes, self.user_ids = pd.factorize(np.asarray(user_ids)[liked], sort=True)
+        movie_codes, self.movie_ids = pd.factorize(np.asarray(movie_ids)[liked], sort=True)
+        self.min_rating = min_rating
+
+        # Duplicate (user, movie) rows are summed, so counts match value_counts on the raw rows
+        counts = np.ones(len(user_codes), dtype=np.int32)
+        shape = (len(self.user_ids), len(self.movie_ids))
+        coo = sparse.coo_matrix((counts, (user_codes, movie_codes)), shape=shape)
+        self.csr = coo.tocsr()
+        self.csc = coo.tocsc()
+
+        # Number of liked rows per movie (column sums)
+        self.like_counts = np.asarray(self.csc.sum(axis=0)).ravel()
+
+        # Likes ingested since the matrices were built
+        self.delta = None
+        self.n_users, self.n_movies = shape
+
+    def with_ratings(self, user_ids, movie_ids, ratings):
+        """Return a new snapshot that also counts these rating rows.
+
+        The matrices are shared and the liked rows are appended to the delta
+        log, so the cost is proportional to the batch. This snapshot is left
+        unchanged and stays valid for readers already using it.
+        """
+        liked = np.asarray(ratings) > self.min_rating
+        user_ids = np.asarray(user_ids)[liked]
+        movie_ids = np.asarray(movie_ids)[liked]
+        delta = self.delta if self.delta is not None else LikeDelta()
+
+        user_codes = self._codes(user_ids, self.user_ids, delta.user_codes, self.n_users)
+        movie_codes = self._codes(movie_ids, self.movie_ids, delta.movie_codes, self.n_movies)
+        for i in np.flatnonzero(user_codes < 0):
+            user_codes[i] = delta.user_codes.setdefault(int(user_ids[i]), len(self.user_ids) + len(delta.user_codes))
+        for i in np.flatnonzero(movie_codes < 0):
+            movie_id = int(movie_ids[i])
+            if movie_id not in delta.movie_codes:
+                delta.movie_codes[movie_id] = len(self.movie_ids) + len(delta.movie_codes)
+                delta.new_movie_ids.append(movie_id)
+            movie_codes[i] = delta.movie_codes[movie_id]
+
+        snapshot = copy.copy(self)
+        snapshot.delta = delta.appended(user_codes, movie_codes)
+        snapshot.n_users = len(self.user_ids) + len(delta.user_codes)
+        snapshot.n_movies = len(self.movie_ids) + len(delta.movie_codes)
+        return snapshot
+
+    @staticmethod
+    def _codes(ids, base_ids, new_codes, n_codes):
+        """Codes for `ids` (base matrix codes, then ingested ones below `n_codes`), -1 if unknown."""
+        codes = np.full(len(ids), -1, dtype=np.int64)
+        if len(base_ids):
+            positions = np.minimum(np.searchsorted(base_ids, ids), len(base_ids) - 1)
+            found = base_ids[positions] == ids
+            codes[found] = positions[found]
+        for i in np.flatnonzero(codes < 0):
+            code = new_codes.get(int(ids[i]), -1)
+            codes[i] = code if code < n_codes else -1
+        return codes
+
+    def _movie_ids_of(self, codes):
+        """Movie IDs for column codes, including movies first liked after the build."""
+        if self.delta is None:
+            return self.movie_ids[codes]
+        n_base = len(self.movie_ids)
+        ids = self.movie_ids[np.minimum(codes, n_base - 1)].astype(np.int64)
+        new = codes >= n_base
+        ids[new] = np.asarray(self.delta.new_movie_ids, dtype=np.int64)[codes[new] - n_base]
+        return ids
+
+    def movie_code(self, movie_id):
+        """Return the column index for a movie ID, or None if nobody liked it."""
+        code = np.searchsorted(self.movie_ids, movie_id)
+        if code < len(self.movie_ids) and self.movie_ids[code] == movie_id:
+            return int(code)
+        if self.delta is not None:
+            code = self.delta.movie_codes.get(int(movie_id))
+            if code is not None and code < self.n_movies:
+                return code
+        return None
+
+    def liked_by(self, code):
+        """Return the row indices of users who liked the movie in column `code`."""
+        if code >= self.csc.shape[1]:
+            users = np.array([], dtype=self.csc.indices.dtype)
+        else:
+            users = self.csc.indices[self.csc.indptr[code]:self.csc.indptr[code + 1]]
+        if self.delta is not None:
+            log_users, log_movies = self._log()
+            users = np.union1d(users, log_users[log_movies == code])
+        return users
+
+    def _log(self):
+        """The (user codes, movie codes) of likes ingested into this snapshot."""
+        return self.delta.users[:self.delta.n], self.delta.movies[:self.delta.n]
+
+    def score(self, movie_id, similarity_threshold):
+        """Score co-liked movies for a seed movie.
+
+        Returns (movie_ids, similar, all) arrays for every movie liked by more
+        than `similarity_threshold` of the seed's audience, or None when the
+        seed has no likes.
+        """
+        code = self.movie_code(movie_id)
+        if code is None:
+            return None
+        if self.delta is not None:
+            return self._score_with_delta(code, similarity_threshold)
+        users = self.liked_by(code)
+
+        # Share of the seed's audience that liked each movie
+        rows = self.csr[users]
+        similar = np.bincount(rows.indices, weights=rows.data, minlength=len(self.movie_ids))
+        similar = similar / len(users)
+        candidates = np.flatnonzero(similar > similarity_threshold)
+
+        # Share of all users who liked any candidate that liked each movie
+        audience = self.csc[:, candidates].indices
+        n_audience = len(np.unique(audience))
+        all_share = self.like_counts[candidates] / n_audience
+
+        self._observe(len(users), rows.nnz, len(candidates), len(audience))
+        return self.movie_ids[candidates], similar[candidates], all_share
+
+    @staticmethod
+    def _observe(n_users, n_co_likes, n_candidates, n_candidate_likes):
+        """Record how much of the index one seed's scoring read."""
+        ROWS_SCANNED.observe(n_users, "seed_audience")
+        ROWS_SCANNED.observe(n_co_likes, "co_likes")
+        ROWS_SCANNED.observe(n_candidate_likes, "candidate_likes")
+        CANDIDATES.observe(n_candidates, "recommend")
+
+    def _score_with_delta(self, code, similarity_threshold):
+        """`score` over the base matrices plus the delta log."""
+        n_base_users, n_base_movies = self.csr.shape
+        log_users, log_movies = self._log()
+        users = self.liked_by(code)
+
+        # Share of the seed's audience that liked each movie
+        rows = self.csr[users[users < n_base_users]]
+        similar = np.bincount(rows.indices, weights=rows.data, minlength=self.n_movies)
+        similar += np.bincount(log_movies[np.isin(log_users, users)], minlength=self.n_movies)
+        similar = similar / len(users)
+        candidates = np.flatnonzero(similar > similarity_threshold)
+
+        # Share of all users who liked any candidate that liked each movie
+        base_candidates = candidates[candidates < n_base_movies]
+        in_log = np.isin(log_movies, candidates)
+        n_audience = len(np.union1d(self.csc[:, base_candidates].indices, log_users[in_log]))
+        like_counts = np.zeros(len(candidates), dtype=np.int64)
+        like_counts[:len(base_candidates)] = self.like_counts[base_candidates]
+        like_counts += np.bincount(np.searchsorted(candidates, log_movies[in_log]), minlength=len(candidates))
+        all_share = like_counts / n_audience
+
+        self._observe(len(users), rows.nnz, len(candidates), self.csc[:, base_candidates].nnz + in_log.sum())
+        return self._movie_ids_of(candidates), similar[candidates], all_share
+
+    def affected_movies(self, user_ids, movie_ids, ratings):
+        """Movie IDs whose recommendations may change once these rating rows are counted.
+
+        That is every liked movie plus every movie liked by someone who liked
+        one of them. Call on a snapshot that already includes the rows.
+        """
+        liked = np.asarray(ratings) > self.min_rating
+        delta = self.delta if self.delta is not None else LikeDelta(0)
+        user_codes = self._codes(np.asarray(user_ids)[liked], self.user_ids, delta.user_codes, self.n_users)
+        movie_codes = np.unique(self._codes(np.asarray(movie_ids)[liked], self.movie_ids, delta.movie_codes,
+                                            self.n_movies))
+        movie_codes = movie_codes[movie_codes >= 0]
+
+        audience = np.unique(np.concatenate([user_codes[user_codes >= 0]] +
+                                            [self.liked_by(code) for code in movie_codes]))
+        movies = [movie_codes, self.csr[audience[audience < self.csr.shape[0]]].indices]
+        if self.delta is not None:
+            log_users, log_movies = self._log()
+            movies.append(log_movies[np.isin(log_users, audience)])
+        return self._movie_ids_of(np.unique(np.concatenate(movies)))
+
+    def score_batch(self, movie_ids, similarity_threshold):
+        """Score co-liked movies for many seeds in one pass of sparse products.
+
+        Returns a list aligned with `movie_ids` holding what `score` would
+        return for each seed.
+        """
+        if self.delta is not None:
+            return [self.score(movie_id, similarity_threshold) for movie_id in movie_ids]
+        codes = [self.movie_code(movie_id) for movie_id in movie_ids]
+        present = [i for i, code in enumerate(codes) if code is not None]
+        results = [None] * len(codes)
+        if not present:
+            return results
+
+        # Seed x user indicator of each seed's audience (duplicate likes count once)
+        seeds = self.csc[:, [codes[i] for i in present]].T.tocsr()
+        seeds.data[:] = 1
+        audience_sizes = np.diff(seeds.indptr)
+
+        # Seed x movie like counts among each seed's audience, as a share of the audience
+        co = (seeds @ self.csr).tocsr()
+        co.sort_indices()
+        row_sizes = np.diff(co.indptr)
+        similar = co.data / np.repeat(audience_sizes, row_sizes)
+        keep = similar > similarity_threshold
+        cols = co.indices[keep]
+        similar = similar[keep]
+        seed_rows = np.repeat(np.arange(len(present)), row_sizes)[keep]
+        bounds = np.zeros(len(present) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(seed_rows, minlength=len(present)), out=bounds[1:])
+
+        # Number of distinct users who liked any of each seed's candidates
+        candidates = sparse.csr_matrix((np.ones(len(cols), dtype=np.int32), cols, bounds), shape=co.shape)
+        n_audience = np.diff((candidates @ self.csc.T).tocsr().indptr)
+        ROWS_SCANNED.observe(seeds.nnz, "seed_audience")
+        ROWS_SCANNED.observe(co.nnz, "co_likes")
+        CANDIDATES.observe(len(cols), "recommend_batch")
+
+        for j, i in enumerate(present):
+            row = slice(bounds[j], bounds[j + 1])
+            results[i] = (self.movie_ids[cols[row]], similar[row], self.like_counts[cols[row]] / n_audience[j])
+        return results
+
+    def user_likes(self, user_id):
+        """Return (row code, liked column codes) for a user, or None if they liked nothing."""
+        delta = self.delta if self.delta is not None else LikeDelta(0)
+        code = int(self._codes(np.array([user_id]), self.user_ids, delta.user_codes, self.n_users)[0])
+        if code < 0:
+            return None
+        if code < self.csr.shape[0]:
+            movies = self.csr.indices[self.csr.indptr[code]:self.csr.indptr[code + 1]]
+        else:
+            movies = np.array([], dtype=self.csr.indices.dtype)
+        if self.delta is not None:
+            log_users, log_movies = self._log()
+            movies = np.union1d(movies, log_movies[log_users == code])
+        return code, movies
+
+    def score_user(self, user_id, similarity_threshold, max_neighbors):
+        """Score movies for a user from the likes of the users who share their tastes.
+
+        One pass over the columns of the user's liked movies counts every
+        other user's overlap with them; the `max_neighbors` users with the
+        largest overlap are kept (ties by row), so the second pass over their
+        rows costs the same however many movies the user liked. A movie's
+        similarity is the overlap-weighted share of those neighbours who liked
+        it and its overall share is the share of all users who did.
+
+        Returns (movie_ids, similar, all_share) for every movie the user has
+        not liked with similarity above `similarity_threshold`, or None when
+        the user has no likes.
+        """
+        liked = self.user_likes(user_id)
+        if liked is None:
+            return None
+        code, movies = liked
+        n_base_users, n_base_movies = self.csr.shape
+
+        # Every user's number of likes in common with this one
+        columns = self.csc[:, movies[movies < n_base_movies]]
+        overlap = np.bincount(columns.indices, weights=columns.data, minlength=self.n_users)
+        if self.delta is not None:
+            log_users, log_movies = self._log()
+            overlap += np.bincount(log_users[np.isin(log_movies, movies)], minlength=self.n_users)
+        overlap[code] = 0
+        neighbors = np.flatnonzero(overlap)
+        neighbors = neighbors[np.lexsort((neighbors, -overlap[neighbors]))[:max_neighbors]]
+        if len(neighbors) == 0:
+            return self.movie_ids[:0], np.zeros(0), np.zeros(0)
+        neighbors.sort()
+
+        # Overlap-weighted share of the neighbours that liked each movie
+        base_neighbors = neighbors[neighbors < n_base_users]
+        rows = self.csr[base_neighbors]
+        weights = np.repeat(overlap[base_neighbors], np.diff(rows.indptr)) * rows.data
+        similar = np.bincount(rows.indices, weights=weights, minlength=self.n_movies)
+        like_counts = np.zeros(self.n_movies)
+        like_counts[:n_base_movies] = self.like_counts
+        if self.delta is not None:
+            in_log = np.isin(log_users, neighbors)
+            similar += np.bincount(log_movies[in_log], weights=overlap[log_users[in_log]], minlength=self.n_movies)
+            like_counts += np.bincount(log_movies, minlength=self.n_movies)
+        similar = similar / overlap[neighbors].sum()
+        similar[movies] = 0
+        candidates = np.flatnonzero(similar > similarity_threshold)
+
+        ROWS_SCANNED.observe(columns.nnz, "user_profile")
+        ROWS_SCANNED.observe(rows.nnz, "neighbor_likes")
+        CANDIDATES.observe(len(candidates), "user")
+        return self._movie_ids_of(candidates), similar[candidates], like_counts[candidates] / self.n_users
+
+    def top(self, movie_id, similarity_threshold, k):
+        """Return the top-k (movie_ids, scores) for a seed, or None when the seed has no likes.
+
+        Scores are the ratio of the seed audience's share to the overall share;
+        ties are broken by ascending movie ID.
+        """
+        return self._rank(self.score(movie_id, similarity_threshold), k)
+
+    def top_batch(self, movie_ids, similarity_threshold, k):
+        """`top` for many seeds, scored together with `score_batch`."""
+        return [self._rank(scored, k) for scored in self.score_batch(movie_ids, similarity_threshold)]
+
+    @staticmethod
+    def _rank(scored, k):
+        if scored is None:
+            return None
+        movie_ids, similar, all_share = scored
+        scores = similar / all_share
+        order = np.lexsort((movie_ids, -scores))[:k]
+        return movie_ids[order], scores[order]
+
+
+class RatedIndex:
+    """Movies each user has rated at any value, CSR-style: sorted user IDs, row offsets and movie IDs.
+
+    Ratings already sorted by user (as MovieLens ships them) are indexed in
+    place, so the movie column is the (memory-mapped) rating array itself;
+    otherwise sorted copies are made once. Ratings ingested later go to an
+    append-only log; see `with_ratings`.
+    """
+
+    def __init__(self, user_ids, movie_ids):
+        user_ids = np.asarray(user_ids)
+        movie_ids = np.asarray(movie_ids)
+        if len(user_ids) and not np.all(user_ids[1:] >= user_ids[:-1]):
+            order = np.argsort(user_ids, kind="stable")
+            user_ids, movie_ids = user_ids[order], movie_ids[order]
+        starts = np.flatnonzero(np.diff(user_ids)) + 1 if len(user_ids) else np.zeros(0, dtype=np.int64)
+        self.offsets = np.concatenate([[0], starts, [len(user_ids)]]).astype(np.int64)
+        self.user_ids = user_ids[self.offsets[:-1]]
+        self.movie_ids = movie_ids
+        # Ingested movie IDs, and each user's positions in that log, one array per batch
+        self.log = np.empty(0, dtype=movie_ids.dtype)
+        self.n_log = 0
+        self.log_positions = {}
+
+    def with_ratings(self, user_ids, movie_ids):
+        """Return a new snapshot that also has these rating rows; this one is left unchanged.
+
+        Snapshots share the log and the position lists, but only read their
+        first `n_log` entries, so appending costs time proportional to the
+        batch and never changes what an older snapshot sees.
+        """
+        snapshot = copy.copy(self)
+        n = self.n_log + len(movie_ids)
+        if n > len(self.log):
+            snapshot.log = np.empty(max(n, 2 * len(self.log), 1024), dtype=self.log.dtype)
+            snapshot.log[:self.n_log] = self.log[:self.n_log]
+        snapshot.log[self.n_log:n] = movie_ids
+        positions = pd.Series(np.arange(self.n_log, n))
+        for user_id, rows in positions.groupby(np.asarray(user_ids)):
+            snapshot.log_positions.setdefault(int(user_id), []).append(rows.to_numpy())
+        snapshot.n_log = n
+        return snapshot
+
+    def movies(self, user_id):
+        """IDs of the movies a user has rated (empty if none); cost proportional to their history."""
+        i = np.searchsorted(self.user_ids, user_id)
+        if i < len(self.user_ids) and self.user_ids[i] == user_id:
+            rated = self.movie_ids[self.offsets[i]:self.offsets[i + 1]]
+        else:
+            rated = self.movie_ids[:0]
+        # Batches are appended in log order, so the ones this snapshot can see come first
+        logged = [self.log[rows] for rows in self.log_positions.get(int(user_id), ()) if rows[0] < self.n_log]
+        return np.concatenate([rated, *logged]) if logged else rated
+
+
+# Fold the delta log into fresh matrices once it outgrows this share of the base likes
+COMPACT_FRACTION = 0.10
+COMPACT_MIN_LIKES = 50_000
+
+# Byte layout of an ingested rating row in the dataset version hash (fixed byte order, so hosts agree)
+INGEST_ROW_DTYPE = np.dtype([("userId", "<i4"), ("movieId", "<i4"), ("rating", "<f4")])
+
+# Per-user recommendations: neighbours scored per user, list length kept per user, users kept
+USER_NEIGHBORS = 2000
+USER_RECOMMENDATIONS_MAX = 200
+USER_CACHE_SIZE = 4096
+
+# Index movie rows by ID in a dense array while max ID <= max(DENSE_ID_MIN, DENSE_ID_FACTOR * movies)
+DENSE_ID_MIN = 1 << 20
+DENSE_ID_FACTOR = 32
+
+# Engines behind get_recommendations: co-liked movie counts, ALS item factors, or
+# co-liked movie counts blended with tag/genre similarity (CONTENT_WEIGHT of the score)
+RECOMMENDATION_MODES = ("cooccurrence", "als", "hybrid")
+CONTENT_WEIGHT = 0.3
+
 
 class MovieRecommender:
     """Movie recommendation system using TF-IDF and collaborative filtering."""
@@ -15,8 +460,16 @@ class MovieRecommender:
             # Define common locations to check for data files
             data_locations = [".", "./data", "../data"]
             
+            # An explicit data directory takes precedence over the search below
+            data_dir = os.getenv("MOVIE_DATA_DIR")
+            if data_dir:
+                self.movies_path = os.path.join(data_dir, "movies.csv")
+                self.ratings_path = os.path.join(data_dir, "ratings.csv")
+                if not (os.path.exists(self.movies_path) and os.path.exists(self.ratings_path)):
+                    raise FileNotFoundError(f"Could not find movies.csv and ratings.csv in {data_dir}")
+                logging.info(f"Using movie data files in: {data_dir}")
             # First check if we're in a directory with the CSV files
-            if os.path.exists("movies.csv") and os.path.exists("ratings.csv"):
+            elif os.path.exists("movies.csv") and os.path.exists("ratings.csv"):
                 self.movies_path = "movies.csv"
                 self.ratings_path = "ratings.csv"
                 logging.info("Found movie data files in current directory")
@@ -33,93 +486,550 @@ class MovieRecommender:
                 else:
                     raise FileNotFoundError("Could not find movies.csv and ratings.csv in any expected location")
             
-            # Load the data
-            logging.info(f"Loading movies from {self.movies_path}")
-            self.movies = pd.read_csv(self.movies_path)
-            logging.info(f"Loading ratings from {self.ratings_path}")
-            self.ratings = pd.read_csv(self.ratings_path)
+            # Load the data, from the binary cache when it matches the CSV files
+            self._cache_dir = os.getenv("MOVIE_DATA_CACHE", data_cache.default_cache_dir(self.ratings_path))
+            self._data_hash = None
+            arrays = data_cache.load(self._cache_dir, self.movies_path, self.ratings_path)
+            if arrays is None:
+                arrays = self._load_csv()
+                data_cache.save(self._cache_dir, self.movies_path, self.ratings_path, arrays)
+                # Continue from the memory-mapped cache, as a warm start would, once it is written
+                arrays = data_cache.load(self._cache_dir, self.movies_path, self.ratings_path) or arrays
+            self._init_from_arrays(arrays)
+            
+            # Sparse "liked" index for the default rating threshold
+            self._like_indexes = {}
+            self._ingest_lock = threading.Lock()
+            self._ingested = []
+            self._ingest_digest = hashlib.sha256()
+            self._like_index(4)
+            self._rated = RatedIndex(self.rating_user_ids, self.rating_movie_ids)
             
-            # Create clean titles for better search
-            self.movies["clean_title"] = self.movies["title"].apply(self._clean_title)
+            # Ranked per-user lists, keyed by the ratings version they were computed on
+            self._ratings_version = 0
+            self._user_cache = MemoryBackend(max_entries=USER_CACHE_SIZE)
             
-            # Initialize the TF-IDF vectorizer
-            self.vectorizer = TfidfVectorizer(ngram_range=(1, 2))
-            self.tfidf = self.vectorizer.fit_transform(self.movies["clean_title"])
+            # Precomputed top-K table built by precompute.py, if present and fresh
+            # (artifacts share one memoized hash of the data files, see data_hash)
+            table_path = os.getenv("RECOMMENDATION_TABLE", default_artifact_path(self.ratings_path, TABLE_FILENAME))
+            self.table = RecommendationTable.load_if_fresh(table_path, self.data_hash)
+            
+            # ALS factors trained by train_factors.py, for mode="als"
+            factors_path = os.getenv("FACTOR_MODEL", default_artifact_path(self.ratings_path, FACTORS_FILENAME))
+            self.factors = FactorModel.load_if_fresh(factors_path, self.data_hash)
+            
+            # Tag/genre neighbours built by build_content.py, for cold seeds and mode="hybrid"
+            content_path = os.getenv("CONTENT_MODEL", default_artifact_path(self.ratings_path, CONTENT_FILENAME))
+            tags_path = tags_path_for(self.movies_path)
+            self.content = ContentNeighbors.load_if_fresh(content_path,
+                                                          lambda: source_hash(self.movies_path, tags_path))
+            
+            # Fingerprint of the files behind every response (see dataset_version)
+            sources = [self.movies_path, self.ratings_path]
+            sources += [path for path, artifact in ((table_path, self.table), (factors_path, self.factors),
+                                                    (content_path, self.content)) if artifact is not None]
+            if self.content is not None and tags_path is not None:
+                sources.append(tags_path)
+            self._source_version = hashlib.sha256(
+                json.dumps(data_cache.source_key(*sources)).encode()).hexdigest()[:16]
             
             logging.info("MovieRecommender initialized successfully")
         except Exception as e:
             logging.error(f"Error initializing MovieRecommender: {e}")
             raise
     
+    def data_hash(self):
+        """Content hash of movies.csv and ratings.csv that artifacts are keyed by.
+        
+        Computed at most once per process, and across processes only when the
+        files change: it is memoized in the data cache manifest.
+        """
+        if self._data_hash is None:
+            self._data_hash = data_cache.data_hash(self._cache_dir, self.movies_path, self.ratings_path)
+        return self._data_hash
+    
+    def _load_csv(self):
+        """Parse the CSV files and fit TF-IDF, returning the compact arrays the cache stores."""
+        logging.info(f"Loading movies from {self.movies_path}")
+        movies = pd.read_csv(self.movies_path, dtype={"movieId": np.int32})
+        logging.info(f"Loading ratings from {self.ratings_path}")
+        # Bounds the CSV loader only (parse buffers and the rating arrays), not the
+        # like and rated indexes built from its output afterwards
+        memory_limit = os.getenv("RATINGS_LOADER_MEMORY_MB")
+        ratings = load_ratings(self.ratings_path, memory_limit=int(memory_limit) << 20 if memory_limit else None)
+        
+        # Create clean titles for better search
+        clean_titles = movies["title"].apply(self._clean_title)
+        
+        # Fit the TF-IDF vectorizer
+        vectorizer = TfidfVectorizer(ngram_range=(1, 2))
+        tfidf = vectorizer.fit_transform(clean_titles)
+        
+        return {
+            "movie_ids": movies["movieId"].to_numpy(),
+            **self._pack("titles", movies["title"]),
+            **self._pack("genres", movies["genres"]),
+            **self._pack("clean_titles", clean_titles),
+            **self._pack("json_heads", [f'{{"genres":{json.dumps(g)},"movieId":{int(i)},'
+                                        for g, i in zip(movies["genres"], movies["movieId"])]),
+            **self._pack("json_tails", [f'"title":{json.dumps(t)}}}' for t in movies["title"]]),
+            **ratings,
+            "vocabulary": vectorizer.get_feature_names_out().astype(str),
+            "idf": vectorizer.idf_,
+            "tfidf_data": tfidf.data,
+            "tfidf_indices": tfidf.indices,
+            "tfidf_indptr": tfidf.indptr,
+        }
+    
+    @staticmethod
+    def _pack(name, strings):
+        """Pack a string column into the <name>_data/<name>_offsets arrays the cache stores."""
+        packed = PackedStrings.from_strings(strings)
+        return {f"{name}_data": packed.data, f"{name}_offsets": packed.offsets}
+    
+    def _init_from_arrays(self, arrays):
+        """Attach the model to cached arrays and restore the fitted vectorizer.
+        
+        Everything is kept as numpy arrays (no pandas frames or object columns)
+        so a model built before forking is shared copy-on-write by workers.
+        """
+        self.movie_ids = arrays["movie_ids"]
+        self.titles = PackedStrings(arrays["titles_data"], arrays["titles_offsets"])
+        self.genres = PackedStrings(arrays["genres_data"], arrays["genres_offsets"])
+        self.clean_titles = PackedStrings(arrays["clean_titles_data"], arrays["clean_titles_offsets"])
+        # Each movie's JSON record, pre-encoded in sorted-key order around the optional "score"
+        self.json_heads = PackedStrings(arrays["json_heads_data"], arrays["json_heads_offsets"])
+        self.json_tails = PackedStrings(arrays["json_tails_data"], arrays["json_tails_offsets"])
+        self.rating_user_ids = arrays["rating_user_ids"]
+        self.rating_movie_ids = arrays["rating_movie_ids"]
+        self.rating_values = arrays["ratings"]
+        
+        # movieId -> row lookup: a dense array indexed by ID when the IDs are
+        # compact enough, else binary search over the sorted IDs
+        self._movie_order = np.argsort(self.movie_ids, kind="stable")
+        self._sorted_movie_ids = self.movie_ids[self._movie_order]
+        self._row_of_id = None
+        max_id = int(self.movie_ids.max()) if len(self.movie_ids) else -1
+        if 0 <= self.movie_ids.min(initial=0) and max_id <= max(DENSE_ID_MIN, DENSE_ID_FACTOR * len(self.movie_ids)):
+            unique_ids, first_rows = np.unique(self.movie_ids, return_index=True)
+            self._row_of_id = np.full(max_id + 1, -1, dtype=np.int64)
+            self._row_of_id[unique_ids] = first_rows
+        
+        # Restore the fitted vectorizer without refitting
+        vocabulary = arrays["vocabulary"]
+        self.vectorizer = TfidfVectorizer(ngram_range=(1, 2))
+        self.vectorizer.vocabulary_ = {term: i for i, term in enumerate(vocabulary.tolist())}
+        self.vectorizer.idf_ = np.asarray(arrays["idf"])
+        self.tfidf = sparse.csr_matrix(
+            (arrays["tfidf_data"], arrays["tfidf_indices"], arrays["tfidf_indptr"]),
+            shape=(len(arrays["movie_ids"]), len(vocabulary)))
+        self.title_index = TitleIndex(self.vectorizer, self.tfidf)
+    
     def _clean_title(self, title):
         """Remove special characters from movie titles."""
         return re.sub("[^a-zA-Z0-9 ]", "", title)
     
     def search_movies(self, title, max_results=5):
-        """Search for movies by title using TF-IDF and cosine similarity."""
-        title = self._clean_title(title)
-        query_vec = self.vectorizer.transform([title])
-        similarity = cosine_similarity(query_vec, self.tfidf).flatten()
-        indices = np.argpartition(similarity, -max_results)[-max_results:]
-        # Sort results by similarity (highest first)
-        indices = indices[np.argsort(-similarity[indices])]
-        
-        return self.movies.iloc[indices][["movieId", "title", "genres"]]
+        """Search for movies by title using the TF-IDF inverted index (prefix and typo tolerant)."""
+        with stage("search"):
+            indices = self.title_index.search(self._clean_title(title), max_results)
+        with stage("search_frame"):
+            return self._movie_frame(indices)
+    
+    def search_movies_json(self, title, max_results=5):
+        """`search_movies` as the UTF-8 JSON array its records serialize to, without a frame."""
+        with stage("search"):
+            indices = self.title_index.search(self._clean_title(title), max_results)
+        with stage("search_frame"):
+            return self._records_json(indices)
+    
+    def search_movie_ids(self, title, max_results=5):
+        """The movie IDs `search_movies` would return, best match first."""
+        with stage("search"):
+            return self.movie_ids[self.title_index.search(self._clean_title(title), max_results)]
+    
+    def _movie_rows(self, movie_ids):
+        """Return the rows of `movie_ids` in the movie arrays, -1 where a movie is unknown."""
+        if self._row_of_id is not None:
+            movie_ids = np.asarray(movie_ids, dtype=np.int64)
+            known = (movie_ids >= 0) & (movie_ids < len(self._row_of_id))
+            return np.where(known, self._row_of_id[np.where(known, movie_ids, 0)], -1)
+        positions = np.searchsorted(self._sorted_movie_ids, movie_ids)
+        positions = np.minimum(positions, len(self._sorted_movie_ids) - 1)
+        rows = self._movie_order[positions]
+        return np.where(self._sorted_movie_ids[positions] == movie_ids, rows, -1)
+    
+    def _movie_frame(self, rows):
+        """Build a small movieId/title/genres frame for the given rows."""
+        return pd.DataFrame({
+            "movieId": self.movie_ids[rows],
+            "title": self.titles.take(rows),
+            "genres": self.genres.take(rows),
+        }, index=rows)
+    
+    def _movie_row(self, movie_id):
+        """Return the row of one movie ID, or -1 if it is unknown."""
+        if self._row_of_id is not None:
+            return int(self._row_of_id[movie_id]) if 0 <= movie_id < len(self._row_of_id) else -1
+        return int(self._movie_rows(np.array([movie_id]))[0])
+    
+    def _records_json(self, rows, scores=None):
+        """The JSON array of movie records for `rows`, with a "score" each if `scores` is given."""
+        heads, tails = self.json_heads, self.json_tails
+        if scores is None:
+            records = [heads.raw(row) + tails.raw(row) for row in rows]
+        else:
+            records = [b'%s"score":%s,%s' % (heads.raw(row), repr(score).encode(), tails.raw(row))
+                       for row, score in zip(rows, scores.tolist())]
+        return b"[" + b",".join(records) + b"]"
     
     def get_movie(self, movie_id):
         """Get details for a specific movie by ID."""
-        movie = self.movies[self.movies["movieId"] == movie_id]
-        if len(movie) == 0:
+        row = self._movie_row(movie_id)
+        if row < 0:
+            return None
+        return pd.Series({
+            "movieId": int(self.movie_ids[row]),
+            "title": self.titles[row],
+            "genres": self.genres[row],
+            "clean_title": self.clean_titles[row],
+        }, name=row)
+    
+    def get_movie_json(self, movie_id, clean_title=True):
+        """`get_movie` as the UTF-8 JSON object it serializes to (without clean_title if asked), or None."""
+        row = self._movie_row(movie_id)
+        if row < 0:
             return None
-        return movie.iloc[0]
+        head = self.json_heads.raw(row)
+        if clean_title:
+            head = b'{"clean_title":%s,%s' % (json.dumps(self.clean_titles[row]).encode(), head[1:])
+        return head + self.json_tails.raw(row)
     
-    def get_recommendations(self, movie_id, min_rating=4, similarity_threshold=0.10, max_recommendations=10):
-        """Get movie recommendations based on user behavior."""
+    def _like_index(self, min_rating):
+        """Return the sparse like index for a rating threshold, building it on first use."""
+        index = self._like_indexes.get(min_rating)
+        if index is None:
+            with self._ingest_lock:
+                index = self._like_indexes.get(min_rating)
+                if index is None:
+                    logging.info(f"Building like index for ratings > {min_rating}")
+                    index = LikeIndex(*self._all_ratings(), min_rating)
+                    self._like_indexes[min_rating] = index
+        return index
+    
+    def _all_ratings(self):
+        """The loaded rating arrays plus every ingested batch."""
+        if not self._ingested:
+            return self.rating_user_ids, self.rating_movie_ids, self.rating_values
+        batches = [(self.rating_user_ids, self.rating_movie_ids, self.rating_values)] + self._ingested
+        return tuple(np.concatenate(column) for column in zip(*batches))
+    
+    def add_ratings(self, batch):
+        """Ingest new rating rows without reloading.
+        
+        `batch` has userId, movieId and rating columns (a DataFrame or a dict
+        of arrays). Each like index gets a new snapshot with the rows appended
+        to its delta log, swapped in atomically, so requests in flight keep a
+        consistent view. Cost is proportional to the batch, apart from an
+        occasional compaction once the log outgrows COMPACT_FRACTION of the
+        base. Precomputed table entries the rows may change are marked stale.
+        """
+        user_ids = np.asarray(batch["userId"], dtype=np.int32)
+        movie_ids = np.asarray(batch["movieId"], dtype=np.int32)
+        ratings = np.asarray(batch["rating"], dtype=np.float32)
+        
+        # The table's index must exist to work out which entries go stale
+        if self.table is not None:
+            self._like_index(self.table.min_rating)
+        
+        with self._ingest_lock:
+            self._ingested.append((user_ids, movie_ids, ratings))
+            for min_rating, index in list(self._like_indexes.items()):
+                updated = index.with_ratings(user_ids, movie_ids, ratings)
+                if updated.delta.n > max(COMPACT_MIN_LIKES, COMPACT_FRACTION * updated.csr.nnz):
+                    logging.info(f"Compacting like index for ratings > {min_rating}")
+                    updated = LikeIndex(*self._all_ratings(), min_rating)
+                if self.table is not None and min_rating == self.table.min_rating:
+                    # Mark stale before publishing, so no reader pairs a stale entry with new likes
+                    self.table.invalidate(updated.affected_movies(user_ids, movie_ids, ratings))
+                self._like_indexes[min_rating] = updated
+            self._rated = self._rated.with_ratings(user_ids, movie_ids)
+            self._ratings_version += 1
+            # Hash row by row, so the digest depends on the rows but not on how they were batched
+            rows = np.empty(len(user_ids), dtype=INGEST_ROW_DTYPE)
+            rows["userId"], rows["movieId"], rows["rating"] = user_ids, movie_ids, ratings
+            digest = self._ingest_digest.copy()
+            digest.update(rows.tobytes())
+            self._ingest_digest = digest
+        logging.info(f"Ingested {len(user_ids)} ratings")
+    
+    def dataset_version(self):
+        """Identifier of the data responses are computed from, e.g. for ETags.
+        
+        Changes when the CSV files or a loaded artifact change (by size and
+        modification time) and with every ingested rating: it ends with a
+        running hash of the ingested rows, so processes agree on it exactly
+        when they have ingested the same rows in the same order, however
+        those rows were split into batches.
+        """
+        return f"{self._source_version}-{self._ingest_digest.hexdigest()[:16]}"
+    
+    def get_recommendations(self, movie_id, min_rating=4, similarity_threshold=0.10, max_recommendations=10,
+                            mode="cooccurrence"):
+        """Get movie recommendations based on user behavior.
+        
+        `mode` picks the engine: "cooccurrence" scores movies liked by users
+        who liked this movie; "als" ranks movies by similarity of their ALS
+        item factors (min_rating and similarity_threshold do not apply), which
+        also covers seeds with few or no high ratings; "hybrid" blends the
+        co-occurrence scores with tag/genre similarity (CONTENT_WEIGHT).
+        
+        When content neighbours are loaded, "cooccurrence" seeds that get no
+        recommendations (nobody liked them, or nothing passes the threshold)
+        are served their content neighbours instead.
+        """
+        top = self._top(movie_id, min_rating, similarity_threshold, max_recommendations, mode)
+        with stage("recommend_merge"):
+            return self._recommendation_frame(movie_id, top)
+    
+    def get_recommendations_json(self, movie_id, min_rating=4, similarity_threshold=0.10, max_recommendations=10,
+                                 mode="cooccurrence"):
+        """`get_recommendations` as the UTF-8 JSON array its records serialize to, without a frame."""
+        top = self._top(movie_id, min_rating, similarity_threshold, max_recommendations, mode)
+        with stage("recommend_merge"):
+            return self._recommendation_json(movie_id, top)
+    
+    def _top(self, movie_id, min_rating, similarity_threshold, max_recommendations, mode):
+        """Ranked (movie_ids, scores) for a seed from the engine `mode` selects, or None."""
         try:
-            # Find users who liked this movie
-            similar_users = self.ratings[(self.ratings["movieId"] == movie_id) & 
-                                        (self.ratings["rating"] > min_rating)]["userId"].unique()
-            
-            if len(similar_users) == 0:
-                logging.warning(f"No similar users found for movie ID {movie_id}")
-                return pd.DataFrame(columns=["score", "title", "genres"])
-            
-            # Find movies that these users also liked
-            similar_user_recs = self.ratings[(self.ratings["userId"].isin(similar_users)) & 
-                                            (self.ratings["rating"] > min_rating)]["movieId"]
-            
-            # Calculate the percentage of similar users who liked each movie
-            similar_user_recs = similar_user_recs.value_counts() / len(similar_users)
-            
-            # Filter to movies that a significant percentage of similar users liked
-            similar_user_recs = similar_user_recs[similar_user_recs > similarity_threshold]
-            
-            if len(similar_user_recs) == 0:
-                logging.warning(f"No recommendations meet the threshold for movie ID {movie_id}")
-                return pd.DataFrame(columns=["score", "title", "genres"])
-            
-            # Find all users who liked these recommended movies
-            all_users = self.ratings[(self.ratings["movieId"].isin(similar_user_recs.index)) & 
-                                    (self.ratings["rating"] > min_rating)]
+            if mode == "als":
+                if self.factors is None:
+                    raise RuntimeError("No factor model loaded; run train_factors.py")
+                with stage("recommend_factors"):
+                    top = self.factors.top(movie_id, max_recommendations)
+                RECOMMENDATION_SOURCE.inc(1, "factors")
+                return top
+            if mode == "hybrid":
+                if self.content is None:
+                    raise RuntimeError("No content neighbours loaded; run build_content.py")
+                with stage("recommend_score"):
+                    scored = self._like_index(min_rating).score(movie_id, similarity_threshold)
+                movie_ids, scores = np.zeros(0, dtype=np.int64), np.zeros(0)
+                if scored is not None:
+                    movie_ids, similar, all_share = scored
+                    scores = similar / all_share
+                with stage("recommend_content"):
+                    top = self.content.blend(movie_id, movie_ids, scores, CONTENT_WEIGHT, max_recommendations)
+                RECOMMENDATION_SOURCE.inc(1, "hybrid")
+                return top
+            if mode != "cooccurrence":
+                raise ValueError(f"Unknown recommendation mode {mode!r}")
             
-            # Calculate the percentage of all users who liked each movie
-            all_user_recs = all_users["movieId"].value_counts() / len(all_users["userId"].unique())
+            # Serve from the precomputed table when it covers these parameters
+            top = None
+            source = "table"
+            if self.table is not None and self.table.covers(min_rating, similarity_threshold, max_recommendations):
+                with stage("recommend_lookup"):
+                    top = self.table.lookup(movie_id, max_recommendations)
             
-            # Combine the two metrics
-            rec_percentages = pd.concat([similar_user_recs, all_user_recs], axis=1)
-            rec_percentages.columns = ["similar", "all"]
+            # Otherwise score movies liked by users who liked this movie
+            if top is None:
+                with stage("recommend_score"):
+                    top = self._like_index(min_rating).top(movie_id, similarity_threshold, max_recommendations)
+                source = "live"
             
-            # Calculate a recommendation score (how much more similar users liked this movie)
-            rec_percentages["score"] = rec_percentages["similar"] / rec_percentages["all"]
+            top, source = self._content_fallback(movie_id, top, source, max_recommendations)
+            RECOMMENDATION_SOURCE.inc(1, source)
+            return top
+        except Exception as e:
+            logging.error(f"Error getting recommendations for movie ID {movie_id}: {e}")
+            raise
+    
+    def get_user_recommendations(self, user_id, offset=0, limit=10, min_rating=4, similarity_threshold=0.10):
+        """Recommend movies for a user from their whole liked set, a page at a time.
+        
+        Movies are scored by LikeIndex.score_user (the likes of the users
+        whose likes overlap most with theirs) and exclude every movie the user
+        has rated. The first USER_RECOMMENDATIONS_MAX of the ranking are cached
+        per user, so later pages and repeat calls are slices.
+        
+        Returns (frame, total) where `total` is the number of movies that can
+        be paged through, i.e. the ranking cut at USER_RECOMMENDATIONS_MAX,
+        or None if the user has no ratings.
+        """
+        ranked = self._user_top(user_id, min_rating, similarity_threshold)
+        if ranked is None:
+            return None
+        rows, scores = ranked
+        page = slice(offset, offset + limit)
+        with stage("recommend_merge"):
+            recommendations = self._movie_frame(rows[page])
+            recommendations.insert(0, "score", scores[page])
+            return recommendations.reset_index(drop=True), len(rows)
+    
+    def get_user_recommendations_json(self, user_id, offset=0, limit=10, min_rating=4, similarity_threshold=0.10):
+        """`get_user_recommendations` with the page as the UTF-8 JSON array its records serialize to."""
+        ranked = self._user_top(user_id, min_rating, similarity_threshold)
+        if ranked is None:
+            return None
+        rows, scores = ranked
+        page = slice(offset, offset + limit)
+        with stage("recommend_merge"):
+            return self._records_json(rows[page], scores[page]), len(rows)
+    
+    def _user_top(self, user_id, min_rating, similarity_threshold):
+        """The cached ranking (movie rows, scores) for a user, computing it on a miss; None if unknown."""
+        key = (user_id, min_rating, similarity_threshold, self._ratings_version)
+        ranked, _ = self._user_cache.get(key, 0)
+        if ranked is not None:
+            RECOMMENDATION_SOURCE.inc(1, "user_cache")
+            return ranked
+        
+        try:
+            rated = self._rated.movies(user_id)
+            if len(rated) == 0:
+                return None
+            with stage("recommend_user_score"):
+                scored = self._like_index(min_rating).score_user(user_id, similarity_threshold, USER_NEIGHBORS)
+            RECOMMENDATION_SOURCE.inc(1, "user_live")
             
-            # Sort by score and get the top recommendations
-            rec_percentages = rec_percentages.sort_values("score", ascending=False)
+            if scored is None:
+                movie_ids, scores = np.zeros(0, dtype=np.int64), np.zeros(0)
+            else:
+                movie_ids, similar, all_share = scored
+                unseen = ~np.isin(movie_ids, rated)
+                movie_ids, scores = movie_ids[unseen], similar[unseen] / all_share[unseen]
+            rows = self._movie_rows(movie_ids)
+            order = np.lexsort((movie_ids, -scores))
+            order = order[rows[order] >= 0][:USER_RECOMMENDATIONS_MAX]
+            ranked = rows[order], scores[order]
+        except Exception as e:
+            logging.error(f"Error getting recommendations for user ID {user_id}: {e}")
+            raise
+        
+        # Entries never expire; a new ratings version makes old ones unreachable until evicted
+        self._user_cache.set(key, ranked, float("inf"))
+        return ranked
+    
+    def get_recommendations_batch(self, movie_ids, min_rating=4, similarity_threshold=0.10, max_recommendations=10,
+                                  aggregate=False):
+        """Get recommendations for many seed movies at once.
+        
+        Returns one frame per seed (like get_recommendations), or with
+        `aggregate` a single frame ranking movies by their summed score across
+        all seeds, excluding the seeds themselves.
+        
+        Aggregate rankings are always scored live and skip both the
+        precomputed table and the content fallback: the sum needs every
+        candidate of each seed, not the table's top K, and content
+        similarities are not on the co-occurrence score scale. A seed with
+        no collaborative candidates contributes nothing to the sum.
+        """
+        tops = self._tops_batch(movie_ids, min_rating, similarity_threshold, max_recommendations, aggregate)
+        with stage("recommend_batch_merge"):
+            if aggregate:
+                return self._recommendation_frame(movie_ids, tops)
+            return [self._recommendation_frame(movie_id, top) for movie_id, top in zip(movie_ids, tops)]
+    
+    def get_recommendations_batch_json(self, movie_ids, min_rating=4, similarity_threshold=0.10,
+                                       max_recommendations=10, aggregate=False):
+        """`get_recommendations_batch` as UTF-8 JSON, without frames.
+        
+        With `aggregate` this is the array of records; otherwise an array of
+        {"movieId": ..., "recommendations": [...]} objects, one per seed.
+        """
+        tops = self._tops_batch(movie_ids, min_rating, similarity_threshold, max_recommendations, aggregate)
+        with stage("recommend_batch_merge"):
+            if aggregate:
+                return self._recommendation_json(movie_ids, tops)
+            return b"[" + b",".join(
+                b'{"movieId":%d,"recommendations":%s}' % (movie_id, self._recommendation_json(movie_id, top))
+                for movie_id, top in zip(movie_ids, tops)) + b"]"
+    
+    def _tops_batch(self, movie_ids, min_rating, similarity_threshold, max_recommendations, aggregate):
+        """Ranked (movie_ids, scores) per seed, or with `aggregate` one live ranking for all seeds."""
+        try:
+            index = self._like_index(min_rating)
             
-            # Merge with movie data to get titles and genres
-            recommendations = rec_percentages.head(max_recommendations).merge(
-                self.movies, left_index=True, right_on="movieId")[["score", "movieId", "title", "genres"]]
+            if aggregate:
+                with stage("recommend_batch_score"):
+                    scored = [s for s in index.score_batch(movie_ids, similarity_threshold) if s is not None]
+                if not scored:
+                    return None
+                rec_ids = np.concatenate([ids for ids, _, _ in scored])
+                scores = np.concatenate([similar / all_share for _, similar, all_share in scored])
+                rec_ids, inverse = np.unique(rec_ids, return_inverse=True)
+                scores = np.bincount(inverse, weights=scores)
+                unseen = ~np.isin(rec_ids, np.asarray(movie_ids))
+                rec_ids, scores = rec_ids[unseen], scores[unseen]
+                order = np.lexsort((rec_ids, -scores))[:max_recommendations]
+                return rec_ids[order], scores[order]
             
-            return recommendations
+            # Seeds the precomputed table covers are looked up, the rest scored together
+            tops = [None] * len(movie_ids)
+            if self.table is not None and self.table.covers(min_rating, similarity_threshold, max_recommendations):
+                tops = [self.table.lookup(movie_id, max_recommendations) for movie_id in movie_ids]
+            missing = [i for i, top in enumerate(tops) if top is None]
+            with stage("recommend_batch_score"):
+                live = index.top_batch([movie_ids[i] for i in missing], similarity_threshold, max_recommendations)
+            sources = ["table"] * len(movie_ids)
+            for i, top in zip(missing, live):
+                tops[i], sources[i] = top, "live"
+            for i, movie_id in enumerate(movie_ids):
+                tops[i], sources[i] = self._content_fallback(movie_id, tops[i], sources[i], max_recommendations)
+            for source in set(sources):
+                RECOMMENDATION_SOURCE.inc(sources.count(source), source)
+            return tops
         except Exception as e:
-            logging.error(f"Error getting recommendations for movie ID {movie_id}: {e}")
+            logging.error(f"Error getting batch recommendations for {len(movie_ids)} movies: {e}")
             raise
+    
+    def _content_fallback(self, movie_id, top, source, max_recommendations):
+        """Content neighbours in place of an empty collaborative `top`, when they are loaded.
+        
+        Returns the (top, source) to serve: the seed's content neighbours and
+        "content", or the arguments unchanged.
+        """
+        if self.content is None or (top is not None and len(top[0])):
+            return top, source
+        with stage("recommend_content"):
+            neighbors = self.content.top(movie_id, max_recommendations)
+        if neighbors is None or len(neighbors[0]) == 0:
+            return top, source
+        return neighbors, "content"
+    
+    def _ranked_rows(self, movie_id, top):
+        """Movie rows and scores of a ranking, dropping movies missing from movies.csv; None if empty."""
+        if top is None:
+            logging.warning(f"No similar users found for movie ID {movie_id}")
+            return None
+        
+        movie_ids, scores = top
+        
+        if len(movie_ids) == 0:
+            logging.warning(f"No recommendations meet the threshold for movie ID {movie_id}")
+            return None
+        
+        # Scores are already sorted (ties by movie ID)
+        rows = self._movie_rows(movie_ids)
+        found = rows >= 0
+        return rows[found], scores[found]
+    
+    def _recommendation_frame(self, movie_id, top):
+        """Turn ranked (movie_ids, scores) into a score/movieId/title/genres frame."""
+        ranked = self._ranked_rows(movie_id, top)
+        if ranked is None:
+            return pd.DataFrame(columns=["score", "title", "genres"])
+        
+        rows, scores = ranked
+        recommendations = self._movie_frame(rows)
+        recommendations.insert(0, "score", scores)
+        
+        return recommendations.reset_index(drop=True)
+    
+    def _recommendation_json(self, movie_id, top):
+        """Turn ranked (movie_ids, scores) into the JSON array of score/movieId/title/genres records."""
+        ranked = self._ranked_rows(movie_id, top)
+        if ranked is None:
+            return b"[]"
+        return self._records_json(*ranked)
@@ -0,0 +1,42 @@
+# precompute.py  ― offline build of the top-K recommendation table
+# ---------------------------------------------------------------
+# Usage:  python precompute.py [--workers 8] [--top-k 50]
+#
+# MovieRecommender serves /api/recommend from the resulting artifact when it
+# exists and its data hash matches movies.csv/ratings.csv; otherwise it falls
+# back to computing recommendations live.
+import argparse
+import logging
+import os
+import time
+
+from model import MovieRecommender
+from artifacts import default_artifact_path
+from recommendation_table import TABLE_FILENAME, build_table, save_table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute top-K recommendations for every movie")
+    parser.add_argument("--output", help="artifact path (default: recommendations.npz next to ratings.csv)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("--top-k", type=int, default=50, help="recommendations stored per movie")
+    parser.add_argument("--min-rating", type=float, default=4)
+    parser.add_argument("--similarity-threshold", type=float, default=0.10)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    recommender = MovieRecommender()
+    output = args.output or default_artifact_path(recommender.ratings_path, TABLE_FILENAME)
+
+    start = time.perf_counter()
+    index = recommender._like_index(args.min_rating)
+    seed_ids, offsets, rec_ids, scores = build_table(index, args.similarity_threshold, args.top_k,
+                                                     workers=args.workers)
+    save_table(output, seed_ids, offsets, rec_ids, scores, recommender.data_hash(), args.min_rating,
+               args.similarity_threshold, args.top_k)
+    logging.info(f"Wrote top-{args.top_k} recommendations for {len(seed_ids)} movies to {output} "
+                 f"in {time.perf_counter() - start:.1f}s using {args.workers} workers")
+
+
+if __name__ == "__main__":
+    main()
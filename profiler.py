@@ -0,0 +1,66 @@
+import sys
+import threading
+from collections import Counter
+
+
+class SamplingProfiler:
+    """Statistical profiler sampling the stacks of request threads from a background thread.
+
+    Every `interval` seconds the sampler reads the current frame of each
+    thread registered with `enter` (i.e. serving a request) and counts the
+    stack. Results come out in collapsed-stack format ("f1;f2;f3 count" per
+    line) for flamegraph tools. Threads that are idle or not serving requests
+    are never sampled, so the cost is one stack walk per busy thread per tick.
+    """
+
+    def __init__(self, interval=0.01, max_depth=64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = 0
+        self._stacks = Counter()
+        self._active = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def enter(self):
+        """Mark the calling thread as serving a request."""
+        self._active.add(threading.get_ident())
+
+    def exit(self):
+        self._active.discard(threading.get_ident())
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            active = set(self._active)
+            if not active:
+                continue
+            frames = sys._current_frames()
+            stacks = [self._stack(frames[ident]) for ident in active if ident in frames]
+            with self._lock:
+                self._stacks.update(stacks)
+                self.samples += len(stacks)
+
+    def _stack(self, frame):
+        names = []
+        while frame is not None and len(names) < self.max_depth:
+            code = frame.f_code
+            names.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def collapsed(self, reset=False):
+        """The sampled stacks in collapsed format, most frequent first."""
+        with self._lock:
+            stacks = self._stacks.most_common()
+            if reset:
+                self._stacks.clear()
+                self.samples = 0
+        return "".join(f"{stack} {count}\n" for stack, count in stacks)
@@ -0,0 +1,74 @@
+import io
+import os
+import logging
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+class RatingsTail:
+    """Follow a ratings CSV (userId,movieId,rating[,timestamp]) and ingest appended rows.
+
+    Only complete lines are consumed; a partially written last line is picked
+    up by the next poll. By default tailing starts at the end of the file as
+    of construction, so following the ratings.csv the recommender loaded does
+    not count its rows twice. Create it with the model, before forking
+    workers, so each of them starts from that same offset.
+    """
+
+    def __init__(self, path, recommender, from_start=False, interval=5.0):
+        self.path = path
+        self.recommender = recommender
+        self.interval = interval
+        self.offset = 0 if from_start else os.path.getsize(path)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def poll(self):
+        """Ingest the complete rows appended since the last poll and return how many were read."""
+        size = os.path.getsize(self.path)
+        if size < self.offset:
+            logging.warning(f"{self.path} shrank, tailing it again from the start")
+            self.offset = 0
+        if size == self.offset:
+            return 0
+
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read(size - self.offset)
+        end = data.rfind(b"\n") + 1
+        if end == 0:
+            return 0
+        data, at_start = data[:end], self.offset == 0
+        self.offset += end
+
+        # Skip the header when reading from the top of the file
+        if at_start and data[:1].isalpha():
+            data = data[data.find(b"\n") + 1:]
+        if not data.strip():
+            return 0
+
+        batch = pd.read_csv(io.BytesIO(data), header=None, usecols=[0, 1, 2],
+                            names=["userId", "movieId", "rating"],
+                            dtype={"userId": np.int32, "movieId": np.int32, "rating": np.float32})
+        self.recommender.add_ratings(batch)
+        return len(batch)
+
+    def start(self):
+        """Poll every `interval` seconds on a daemon thread."""
+        self._thread = threading.Thread(target=self._run, name="ratings-tail", daemon=True)
+        self._thread.start()
+        logging.info(f"Tailing {self.path} for new ratings every {self.interval}s")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                logging.error(f"Error ingesting ratings from {self.path}: {e}")
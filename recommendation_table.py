@@ -0,0 +1,86 @@
+import logging
+import os
+
+import numpy as np
+
+from artifacts import load_artifact
+from cooccurrence import table_tops
+
+TABLE_FILENAME = "recommendations.npz"
+TABLE_VERSION = 1
+
+
+def build_table(index, similarity_threshold, k, workers=None, partitions=None):
+    """Compute the top-k recommendations for every liked movie in `index`.
+
+    The index must have no ingested likes (a fresh LikeIndex). Scoring is a
+    map-reduce over user partitions in a process pool (see
+    cooccurrence.table_tops), with the same results as `index.top` for each
+    seed. Returns the CSR-style arrays (seed_ids, offsets, rec_ids, scores).
+    """
+    if index.delta is not None:
+        raise ValueError("build_table needs a like index without ingested ratings")
+    seed_ids = index.movie_ids
+    tops = [(index.movie_ids[codes], scores) for codes, scores in
+            table_tops(index.csr, index.like_counts, similarity_threshold, k, workers=workers or os.cpu_count(),
+                       partitions=partitions)]
+
+    lengths = np.array([len(ids) for ids, _ in tops], dtype=np.int64)
+    offsets = np.zeros(len(tops) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    rec_ids = np.concatenate([ids for ids, _ in tops]).astype(np.int32)
+    scores = np.concatenate([scores for _, scores in tops])
+    return seed_ids.astype(np.int32), offsets, rec_ids, scores
+
+
+def save_table(path, seed_ids, offsets, rec_ids, scores, data_hash, min_rating, similarity_threshold, k):
+    """Write a recommendation table artifact."""
+    np.savez(path, version=TABLE_VERSION, data_hash=data_hash, min_rating=min_rating,
+             similarity_threshold=similarity_threshold, k=k, seed_ids=seed_ids,
+             offsets=offsets, rec_ids=rec_ids, scores=scores)
+
+
+class RecommendationTable:
+    """Precomputed top-K recommendations per seed movie, stored CSR-style."""
+
+    def __init__(self, seed_ids, offsets, rec_ids, scores, min_rating, similarity_threshold, k):
+        self.seed_ids = seed_ids
+        self.offsets = offsets
+        self.rec_ids = rec_ids
+        self.scores = scores
+        self.min_rating = min_rating
+        self.similarity_threshold = similarity_threshold
+        self.k = k
+        # Seeds whose entries may be outdated by ingested ratings
+        self.stale = np.zeros(len(seed_ids), dtype=bool)
+
+    @classmethod
+    def load_if_fresh(cls, path, data_hash):
+        """Load the artifact at `path`, or return None if it is missing, stale or unreadable (see load_artifact)."""
+        table = load_artifact(path, TABLE_VERSION, data_hash, "recommendation table", lambda data: cls(
+            data["seed_ids"], data["offsets"], data["rec_ids"], data["scores"], data["min_rating"].item(),
+            data["similarity_threshold"].item(), int(data["k"])))
+        if table is not None:
+            logging.info(f"Loaded recommendation table for {len(table.seed_ids)} movies from {path}")
+        return table
+
+    def covers(self, min_rating, similarity_threshold, max_recommendations):
+        """Whether lookups for these parameters can be answered from the table."""
+        return (min_rating == self.min_rating and similarity_threshold == self.similarity_threshold
+                and max_recommendations <= self.k)
+
+    def invalidate(self, movie_ids):
+        """Mark the entries of these seeds stale so lookups fall back to live scoring."""
+        positions = np.searchsorted(self.seed_ids, movie_ids)
+        positions = positions[positions < len(self.seed_ids)]
+        positions = positions[np.isin(self.seed_ids[positions], movie_ids)]
+        self.stale[positions] = True
+
+    def lookup(self, movie_id, max_recommendations):
+        """Return (movie_ids, scores) for a seed, or None if it is not in the table or stale."""
+        i = np.searchsorted(self.seed_ids, movie_id)
+        if i == len(self.seed_ids) or self.seed_ids[i] != movie_id or self.stale[i]:
+            return None
+        start = self.offsets[i]
+        end = min(self.offsets[i + 1], start + max_recommendations)
+        return self.rec_ids[start:end].astype(np.int64), self.scores[start:end]
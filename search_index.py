@@ -0,0 +1,169 @@
+import re
+from collections import Counter
+
+import numpy as np
+
+from metrics import CANDIDATES
+
+WORD = re.compile(r"\w+")
+EDIT_ALPHABET = "abcdefghijklmnopqrstuvwxyz0123456789"
+
+# A partial last word shorter than this is completed even if it is a word itself
+MIN_COMPLETE_WORD = 3
+
+
+class TitleIndex:
+    """Inverted index over the TF-IDF title terms for search-as-you-type.
+
+    Postings are the columns of the fitted TF-IDF matrix, so a query scores only
+    the titles that share a term with it, and for whole-word queries the scores
+    equal the cosine similarity against the full matrix. A partially typed last
+    word is expanded to the vocabulary words it is a prefix of (preferring ones
+    that follow the previous word in some title), and unknown words are
+    corrected to the most frequent vocabulary word one edit away.
+    """
+
+    def __init__(self, vectorizer, tfidf, max_completions=5):
+        postings = tfidf.tocsc()
+        self.indptr = postings.indptr
+        self.rows = postings.indices
+        self.weights = postings.data
+        self.vocabulary = vectorizer.vocabulary_
+        self.idf = np.asarray(vectorizer.idf_)
+        self.df = np.diff(postings.indptr)
+        self.max_completions = max_completions
+
+        # Sorted unigram and bigram terms for prefix ranges
+        terms = sorted(self.vocabulary)
+        words = [t for t in terms if " " not in t]
+        bigrams = [t for t in terms if " " in t]
+        self.words = np.array(words)
+        self.word_df = self.df[[self.vocabulary[t] for t in words]]
+        self.bigrams = np.array(bigrams)
+        self.bigram_df = self.df[[self.vocabulary[t] for t in bigrams]]
+
+    def search(self, query, max_results=5):
+        """Return the rows of the best matching titles, best first."""
+        words = WORD.findall(query.lower())
+        if not words:
+            return np.array([], dtype=np.int64)
+
+        # The last word may still be being typed unless the query ends with a space
+        partial = not query.endswith(" ")
+        *head, last = words
+        tokens = [t for t in (self._resolve(w) for w in head) if t is not None]
+
+        alternatives = []
+        if partial and (len(last) < MIN_COMPLETE_WORD or last not in self.vocabulary):
+            # Only titles containing the completed word count for each completion
+            completions = self._completions(last, tokens[-1] if tokens else None)
+            alternatives = [(tokens + [w], w) for w in completions if w != last]
+        if alternatives:
+            # Titles matching just the earlier words (or the word as typed) still count
+            base = tokens + [last] if len(last) >= 2 and last in self.vocabulary else tokens
+        else:
+            resolved = self._resolve(last)
+            base = tokens + [resolved] if resolved is not None else tokens
+        alternatives.append((base, None))
+
+        rows, scores = self._score_alternatives(alternatives)
+        CANDIDATES.observe(len(rows), "search")
+        if len(rows) == 0:
+            return rows
+
+        if len(rows) > max_results:
+            # Keep everything tied with the k-th best so the tie-break below is deterministic
+            cutoff = np.partition(scores, len(scores) - max_results)[len(scores) - max_results]
+            keep = scores >= cutoff
+            rows, scores = rows[keep], scores[keep]
+        # Best first, ties by row
+        return rows[np.lexsort((rows, -scores))][:max_results]
+
+    def _resolve(self, word):
+        """Map a complete query word to a vocabulary word, or None to drop it."""
+        if len(word) < 2:
+            return None
+        if word in self.vocabulary:
+            return word
+        return self._correct(word)
+
+    def _completions(self, prefix, previous=None):
+        """The most frequent vocabulary words starting with `prefix`.
+
+        Words that follow `previous` in some title (per the bigram vocabulary)
+        come first.
+        """
+        completions = []
+        if previous is not None:
+            bigrams = self._most_frequent(self.bigrams, self.bigram_df, f"{previous} {prefix}")
+            completions = [b.split(" ", 1)[1] for b in bigrams]
+        for word in self._most_frequent(self.words, self.word_df, prefix):
+            if word not in completions:
+                completions.append(word)
+        return completions[:self.max_completions]
+
+    def _most_frequent(self, terms, df, prefix):
+        """Up to max_completions of the sorted `terms` starting with `prefix`, most frequent first."""
+        start = np.searchsorted(terms, prefix)
+        end = np.searchsorted(terms, prefix + "\U0010ffff")
+        candidates = np.arange(start, end)
+        if len(candidates) > self.max_completions:
+            best = np.argpartition(-df[candidates], self.max_completions - 1)[:self.max_completions]
+            candidates = candidates[best]
+        candidates = candidates[np.argsort(-df[candidates], kind="stable")]
+        return terms[candidates].tolist()
+
+    def _correct(self, word):
+        """The most frequent vocabulary word one edit away from `word`, if any."""
+        if len(word) < 3:
+            return None
+        splits = [(word[:i], word[i:]) for i in range(len(word) + 1)]
+        edits = set()
+        for left, right in splits:
+            if right:
+                edits.add(left + right[1:])
+            if len(right) > 1:
+                edits.add(left + right[1] + right[0] + right[2:])
+            for c in EDIT_ALPHABET:
+                edits.add(left + c + right)
+                if right:
+                    edits.add(left + c + right[1:])
+        known = [w for w in edits if " " not in w and w in self.vocabulary]
+        if not known:
+            return None
+        return min(known, key=lambda w: (-self.df[self.vocabulary[w]], w))
+
+    def _score(self, tokens, required=None):
+        """Cosine scores of the titles sharing a term with the tokens' TF-IDF vector.
+
+        With `required`, only titles containing that term are scored.
+        """
+        terms = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        counts = Counter(t for t in terms if t in self.vocabulary)
+        if not counts:
+            return np.array([], dtype=np.int64), np.array([])
+        cols = np.array([self.vocabulary[t] for t in counts])
+        query = np.array(list(counts.values()), dtype=float) * self.idf[cols]
+        query /= np.linalg.norm(query)
+
+        rows = np.concatenate([self.rows[self.indptr[c]:self.indptr[c + 1]] for c in cols])
+        weights = np.concatenate([self.weights[self.indptr[c]:self.indptr[c + 1]] * q for c, q in zip(cols, query)])
+        if required is not None:
+            c = self.vocabulary[required]
+            keep = np.isin(rows, self.rows[self.indptr[c]:self.indptr[c + 1]])
+            rows, weights = rows[keep], weights[keep]
+        rows, inverse = np.unique(rows, return_inverse=True)
+        return rows, np.bincount(inverse, weights=weights)
+
+    def _score_alternatives(self, alternatives):
+        """Score each (tokens, required term) alternative and keep each title's best score."""
+        scored = [self._score(tokens, required) for tokens, required in alternatives]
+        if len(scored) == 1:
+            return scored[0]
+        rows = np.concatenate([r for r, _ in scored])
+        scores = np.concatenate([s for _, s in scored])
+        order = np.lexsort((-scores, rows))
+        rows, scores = rows[order], scores[order]
+        first = np.ones(len(rows), dtype=bool)
+        first[1:] = rows[1:] != rows[:-1]
+        return rows[first], scores[first]
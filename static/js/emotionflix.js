@@ -26,6 +26,9 @@ document.addEventListener('DOMContentLoaded', function() {
     // Chat history
     let chatHistory = [];
     
+    // Time (ms) before which chat messages are held back after a 503 from the stream
+    let chatBusyUntil = 0;
+    
     // Tab navigation
     standardTab.addEventListener('click', function() {
         standardTab.classList.add('active');
@@ -244,7 +247,7 @@ document.addEventListener('DOMContentLoaded', function() {
         const chatInput = document.getElementById('chat-message-input');
         const message = chatInput.value.trim();
         
-        if (message.length === 0) {
+        if (message.length === 0 || Date.now() < chatBusyUntil) {
             return;
         }
         
@@ -260,47 +263,187 @@ document.addEventListener('DOMContentLoaded', function() {
         thinkingMessage.innerHTML = '<div class="spinner-grow spinner-grow-sm text-primary me-2"></div> EmotionFlix is thinking...';
         emotionRecommendationsContainer.insertBefore(thinkingMessage, document.querySelector('.emotion-chat-input'));
         
-        // Make request to EmotionFlix chat API
-        fetch('/api/emotionflix/chat', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify({
-                message: message,
-                mood: selectedMood // Include the selected mood if available
-            })
+        // Stream the reply from the EmotionFlix chat API
+        const payload = {
+            message: message,
+            mood: selectedMood // Include the selected mood if available
+        };
+        let reply = null;
+        
+        streamChatReply(payload, function(delta) {
+            // Show the reply as soon as the first tokens arrive
+            if (reply === null) {
+                emotionRecommendationsContainer.removeChild(thinkingMessage);
+                reply = { text: '', element: addToChatHistory('assistant', '') };
+            }
+            reply.text += delta;
+            reply.element.innerHTML = formatEmotionText(reply.text);
         })
-        .then(response => {
-            if (!response.ok) {
-                throw new Error('EmotionFlix chat request failed');
+        .then(streamed => {
+            if (!streamed) {
+                // Streaming not supported here: fall back to the full-response endpoint
+                return fetchChatReply(payload).then(text => {
+                    emotionRecommendationsContainer.removeChild(thinkingMessage);
+                    addToChatHistory('assistant', text);
+                });
             }
-            return response.json();
+            if (reply === null) {
+                // The stream ended without any text; asking again would be a second paid call
+                emotionRecommendationsContainer.removeChild(thinkingMessage);
+                addToChatHistory('assistant', 'I don\'t have anything to add to that. Could you tell me a bit more?');
+                return;
+            }
+            chatHistory[chatHistory.length - 1].message = reply.text;
         })
-        .then(data => {
-            // Remove thinking indicator
-            emotionRecommendationsContainer.removeChild(thinkingMessage);
-            
+        .then(() => {
             // Reset mood selection if any was active
             if (selectedMood) {
                 moodEmojiButtons.forEach(btn => btn.classList.remove('selected'));
                 selectedMood = null;
             }
-            
-            // Add AI response to chat history
-            addToChatHistory('assistant', data.response);
         })
         .catch(error => {
             console.error('EmotionFlix chat error:', error);
             
             // Remove thinking indicator
-            emotionRecommendationsContainer.removeChild(thinkingMessage);
+            if (thinkingMessage.parentNode) {
+                emotionRecommendationsContainer.removeChild(thinkingMessage);
+            }
+            
+            if (error instanceof ChatBusyError) {
+                // Every streaming slot is taken: hold off for Retry-After instead of
+                // tying up a server thread with the blocking endpoint
+                waitForChatSlot(error.retryAfter, message);
+                return;
+            }
             
             // Add error message
             addToChatHistory('assistant', 'I\'m sorry, I\'m having trouble connecting to my emotional intelligence. Please try again.');
         });
     }
     
+    /**
+     * Raised by streamChatReply when the server has no free streaming slot (503)
+     */
+    class ChatBusyError extends Error {
+        constructor(retryAfter) {
+            super('EmotionFlix is busy');
+            this.retryAfter = retryAfter;
+        }
+    }
+    
+    /**
+     * Tell the user EmotionFlix is busy, put their message back in the input and
+     * keep the send button disabled for `seconds`
+     */
+    function waitForChatSlot(seconds, message) {
+        chatBusyUntil = Date.now() + seconds * 1000;
+        addToChatHistory('assistant', `I'm talking with a lot of people right now. Please send that again in ${seconds} seconds.`);
+        
+        const chatInput = document.getElementById('chat-message-input');
+        const sendButton = document.getElementById('chat-send-button');
+        if (chatInput && !chatInput.value) {
+            chatInput.value = message;
+        }
+        if (sendButton) {
+            sendButton.disabled = true;
+        }
+        setTimeout(() => {
+            if (sendButton) {
+                sendButton.disabled = false;
+            }
+        }, seconds * 1000);
+    }
+    
+    /**
+     * POST a chat message to the streaming endpoint and call onDelta with each
+     * piece of the reply as it arrives (server-sent events). Resolves to true
+     * once the stream ends, or to false if streaming is not supported (no
+     * readable body, or no such route); rejects with ChatBusyError on a 503.
+     */
+    function streamChatReply(payload, onDelta) {
+        return fetch('/api/emotionflix/chat/stream', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'Accept': 'text/event-stream'
+            },
+            body: JSON.stringify(payload)
+        })
+        .then(response => {
+            if (response.status === 503) {
+                const retryAfter = parseInt(response.headers.get('Retry-After'), 10);
+                throw new ChatBusyError(retryAfter > 0 ? retryAfter : 5);
+            }
+            if (response.status === 404 || !response.body) {
+                return false;
+            }
+            if (!response.ok) {
+                throw new Error(`EmotionFlix stream request failed (${response.status})`);
+            }
+            
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            
+            function handleEvent(block) {
+                let event = 'message';
+                let data = '';
+                block.split('\n').forEach(line => {
+                    if (line.startsWith('event:')) {
+                        event = line.slice(6).trim();
+                    } else if (line.startsWith('data:')) {
+                        data += line.slice(5).trim();
+                    }
+                });
+                if (event === 'error') {
+                    throw new Error(JSON.parse(data).error || 'EmotionFlix stream failed');
+                }
+                if (event === 'message' && data) {
+                    onDelta(JSON.parse(data).delta);
+                }
+            }
+            
+            function read() {
+                return reader.read().then(({ done, value }) => {
+                    if (done) {
+                        return true;
+                    }
+                    buffer += decoder.decode(value, { stream: true });
+                    // Events are separated by a blank line
+                    let boundary;
+                    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                        handleEvent(buffer.slice(0, boundary));
+                        buffer = buffer.slice(boundary + 2);
+                    }
+                    return read();
+                });
+            }
+            
+            return read();
+        });
+    }
+    
+    /**
+     * POST a chat message to the non-streaming endpoint and return the reply text
+     */
+    function fetchChatReply(payload) {
+        return fetch('/api/emotionflix/chat', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify(payload)
+        })
+        .then(response => {
+            if (!response.ok) {
+                throw new Error('EmotionFlix chat request failed');
+            }
+            return response.json();
+        })
+        .then(data => data.response);
+    }
+    
     /**
      * Add a message to the chat history and display it
      */
@@ -337,6 +480,8 @@ document.addEventListener('DOMContentLoaded', function() {
         
         // Scroll to the new message
         chatContainer.scrollIntoView({ behavior: 'smooth' });
+        
+        return chatContainer.querySelector('.chat-message');
     }
     
     /**
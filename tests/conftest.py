@@ -0,0 +1,31 @@
+import os
+
+import pytest
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+
+def _live_recommender(missing):
+    from model import MovieRecommender
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("MOVIE_DATA_DIR", os.getenv("MOVIE_DATA_DIR", DATA_DIR))
+        mp.setenv("RECOMMENDATION_TABLE", str(missing / "recommendations.npz"))
+        mp.setenv("CONTENT_MODEL", str(missing / "content.npz"))
+        return MovieRecommender()
+
+
+@pytest.fixture(scope="session")
+def live_recommender(tmp_path_factory):
+    """MovieRecommender on the bundled data with the precomputed table and content neighbours disabled.
+
+    Every recommendation is then scored live from the like index, which is
+    what the reference implementations compute.
+    """
+    return _live_recommender(tmp_path_factory.mktemp("no-artifacts"))
+
+
+@pytest.fixture
+def make_recommender(tmp_path):
+    """Factory for fresh recommenders like live_recommender, for tests that ingest ratings."""
+    return lambda: _live_recommender(tmp_path)
@@ -0,0 +1,73 @@
+import os
+import threading
+import time
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def client():
+    os.environ.setdefault("OPENAI_API_KEY", "test")
+    from app import app
+    return app.test_client()
+
+
+@pytest.mark.parametrize("body, error", [
+    ([1, 2], "Body must be a JSON object"),
+    ({"movieIds": [1.7]}, "Invalid movie ID"),
+    ({"movieIds": [True]}, "Invalid movie ID"),
+    ({"movieIds": ["12"]}, "Invalid movie ID"),
+    ({"movieIds": [1], "aggregate": "false"}, "aggregate must be true or false"),
+    ({"movieIds": [1], "aggregate": 1}, "aggregate must be true or false"),
+    ({"movieIds": []}, "movieIds must be a non-empty list"),
+])
+def test_batch_rejects_invalid_bodies(client, body, error):
+    response = client.post("/api/recommend/batch", json=body)
+    assert response.status_code == 400
+    assert response.get_json()["error"] == error
+
+
+@pytest.mark.parametrize("aggregate", [False, True])
+def test_batch_accepts_integer_ids(client, aggregate):
+    response = client.post("/api/recommend/batch", json={"movieIds": [1, 260], "aggregate": aggregate})
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize("if_none_match", ['"{}"', 'W/"{}"', '"other", W/"{}"'])
+def test_matching_etag_is_not_modified(client, if_none_match):
+    etag = client.get("/api/movies/1").headers["ETag"].strip('"')
+    response = client.get("/api/movies/1", headers={"If-None-Match": if_none_match.format(etag)})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == f'"{etag}"'
+
+
+def test_concurrent_identical_requests_compute_once(client, monkeypatch):
+    import app
+
+    # no response cache, so only in-flight coalescing can spare the recomputation
+    monkeypatch.setattr(app, "response_cache", None)
+    calls = []
+
+    def get_recommendations_json(movie_id, **kwargs):
+        calls.append(movie_id)
+        time.sleep(0.5)  # long enough for every other request to arrive while this one runs
+        return b"[]"
+
+    monkeypatch.setattr(app.recommender, "get_recommendations_json", get_recommendations_json)
+    clients = 16
+    barrier = threading.Barrier(clients)
+    responses = []
+
+    def request():
+        barrier.wait()
+        responses.append(app.app.test_client().get("/api/recommend?movieId=1"))
+
+    threads = [threading.Thread(target=request) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [1]
+    assert [response.status_code for response in responses] == [200] * clients
+    assert len({response.data for response in responses}) == 1
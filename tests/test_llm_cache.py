@@ -0,0 +1,102 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+
+import llm_cache
+from llm_cache import MemoryBackend, ResponseCache, SqliteBackend
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+import emotion_flix  # noqa: E402  (the OpenAI client is created at import)
+
+
+class FakeCompletions:
+    """Stands in for client.chat.completions: counts calls and returns `content`, or raises `error`."""
+
+    def __init__(self):
+        self.calls = 0
+        self.content = "a canned reply"
+        self.error = None
+
+    def create(self, **kwargs):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=self.content))],
+                               usage=SimpleNamespace(prompt_tokens=10, completion_tokens=3))
+
+
+@pytest.fixture
+def completions(monkeypatch):
+    """A fake OpenAI client and an empty in-memory response cache installed in emotion_flix."""
+    fake = FakeCompletions()
+    monkeypatch.setattr(emotion_flix, "client", SimpleNamespace(chat=SimpleNamespace(completions=fake)))
+    monkeypatch.setattr(emotion_flix, "response_cache", ResponseCache(MemoryBackend(16)))
+    return fake
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A settable clock for llm_cache, starting at 1000."""
+    now = SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(llm_cache, "time", SimpleNamespace(time=lambda: now.value))
+    return now
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    """Each backend, holding at most two entries."""
+    if request.param == "memory":
+        return MemoryBackend(max_entries=2)
+    return SqliteBackend(str(tmp_path / "cache.sqlite"), max_entries=2)
+
+
+def test_hit_after_miss(completions):
+    first = emotion_flix.get_emotionflix_response("I feel nostalgic")
+    # the key ignores case and whitespace
+    second = emotion_flix.get_emotionflix_response("  i feel   NOSTALGIC ")
+    assert first == second == completions.content
+    assert completions.calls == 1
+    stats = emotion_flix.response_cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+
+def test_failed_completion_is_not_cached(completions):
+    completions.error = RuntimeError("upstream failed")
+    for _ in range(2):
+        assert emotion_flix.get_emotionflix_response("a failing message") != completions.content
+    assert completions.calls == 2
+    assert emotion_flix.response_cache.stats()["entries"] == 0
+
+
+def test_empty_completion_is_not_cached(completions):
+    completions.content = ""
+    for _ in range(2):
+        assert emotion_flix.get_emotionflix_response("an empty reply") == ""
+    assert completions.calls == 2
+    assert emotion_flix.response_cache.stats()["entries"] == 0
+
+
+def test_ttl_expiry(backend, clock):
+    cache = ResponseCache(backend, ttl=60)
+    cache.set("a", "1")
+    clock.value += 59
+    assert cache.get("a") == "1"
+    clock.value += 2
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+    assert cache.stats()["entries"] == 0
+
+
+def test_lru_eviction(backend, clock):
+    cache = ResponseCache(backend, ttl=3600)
+    for key in "abc":
+        clock.value += 1
+        cache.set(key, key)
+        if key == "b":
+            # touch a so b is the least recently used when c arrives
+            clock.value += 1
+            assert cache.get("a") == "a"
+    assert [cache.get(key) for key in "abc"] == ["a", None, "c"]
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["entries"] == 2
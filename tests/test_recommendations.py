@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from benchmark import frames, legacy_recommendations
+from recommendation_table import build_table
+
+
+@pytest.fixture(scope="module")
+def legacy_frames(live_recommender):
+    return frames(live_recommender)
+
+
+def sampled_seeds(recommender, n=100, seed=0):
+    """Random movies plus the most liked ones, whose candidate sets are largest."""
+    rng = np.random.default_rng(seed)
+    index = recommender._like_index(4)
+    popular = index.movie_ids[np.argsort(-index.like_counts, kind="stable")[:10]]
+    return np.concatenate([rng.choice(recommender.movie_ids, n, replace=False), popular])
+
+
+def test_matches_legacy_pandas_implementation(live_recommender, legacy_frames):
+    ratings, movies = legacy_frames
+    for movie_id in sampled_seeds(live_recommender):
+        new = live_recommender.get_recommendations(movie_id)
+        old = legacy_recommendations(ratings, movies, movie_id)
+        # the score sequence must match exactly; movies tied on score may be ordered differently
+        np.testing.assert_array_equal(new["score"].to_numpy(float), old["score"].to_numpy(float), err_msg=str(movie_id))
+        if len(new) == 0:
+            continue
+        old_scores = old.set_index("movieId")["score"]
+        for rec_id, score in zip(new["movieId"], new["score"]):
+            if rec_id in old_scores.index:
+                assert score == old_scores[rec_id], (movie_id, rec_id)
+
+
+@pytest.mark.parametrize("workers, partitions", [(1, 1), (1, 5), (2, None)])
+def test_table_build_matches_live_scoring(live_recommender, workers, partitions):
+    index = live_recommender._like_index(4)
+    seed_ids, offsets, rec_ids, scores = build_table(index, 0.10, 20, workers=workers, partitions=partitions)
+    np.testing.assert_array_equal(seed_ids, index.movie_ids)
+    for i in np.random.default_rng(0).choice(len(seed_ids), 500, replace=False):
+        expected_ids, expected_scores = index.top(seed_ids[i], 0.10, 20)
+        np.testing.assert_array_equal(rec_ids[offsets[i]:offsets[i + 1]], expected_ids)
+        np.testing.assert_array_equal(scores[offsets[i]:offsets[i + 1]], expected_scores)
+
+
+def test_unknown_seed_has_no_recommendations(live_recommender):
+    assert len(live_recommender.get_recommendations(-1)) == 0
+
+
+def test_dataset_version_ignores_batch_boundaries(make_recommender):
+    rows = {"userId": [1, 2, 3, 4], "movieId": [1, 1, 260, 260], "rating": [5.0, 4.5, 5.0, 4.0]}
+    whole, split, reordered = make_recommender(), make_recommender(), make_recommender()
+    assert whole.dataset_version() == split.dataset_version()
+
+    whole.add_ratings(rows)
+    split.add_ratings({column: values[:1] for column, values in rows.items()})
+    split.add_ratings({column: values[1:] for column, values in rows.items()})
+    reordered.add_ratings({column: values[::-1] for column, values in rows.items()})
+    assert split.dataset_version() == whole.dataset_version()
+    assert reordered.dataset_version() != whole.dataset_version()
@@ -0,0 +1,40 @@
+# train_factors.py  ― offline ALS training for /api/recommend?mode=als
+# ---------------------------------------------------------------
+# Usage:  python train_factors.py [--factors 32] [--iterations 10]
+#
+# MovieRecommender loads the resulting artifact when it exists and its data
+# hash matches movies.csv/ratings.csv; without it mode=als is unavailable.
+import argparse
+import logging
+import time
+
+from artifacts import default_artifact_path
+from factor_model import FACTORS_FILENAME, train_als
+from model import MovieRecommender
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train ALS item/user factors on ratings.csv")
+    parser.add_argument("--output", help="artifact path (default: factors.npz next to ratings.csv)")
+    parser.add_argument("--factors", type=int, default=32, help="latent dimensions")
+    parser.add_argument("--iterations", type=int, default=10, help="ALS sweeps over users and items")
+    parser.add_argument("--regularization", type=float, default=1.0)
+    parser.add_argument("--alpha", type=float, default=1.0, help="confidence added per rating star")
+    parser.add_argument("--random-state", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    recommender = MovieRecommender()
+    output = args.output or default_artifact_path(recommender.ratings_path, FACTORS_FILENAME)
+
+    start = time.perf_counter()
+    model = train_als(recommender.rating_user_ids, recommender.rating_movie_ids, recommender.rating_values,
+                      factors=args.factors, regularization=args.regularization, alpha=args.alpha,
+                      iterations=args.iterations, random_state=args.random_state)
+    model.save(output, recommender.data_hash())
+    logging.info(f"Wrote {args.factors}-factor model for {len(model.movie_ids)} movies and "
+                 f"{len(model.user_ids)} users to {output} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()